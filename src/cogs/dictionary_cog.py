@@ -5,18 +5,33 @@ from discord.ext import commands
 
 from util import (
     generate_logger,
+    set_deadline,
     Pages,
+    FieldPages,
+    PageSource,
+    get_word_examples,
     get_definition,
     get_synonyms,
     get_antonyms,
     get_similar_words,
     get_rhymes,
-    get_word_of_the_day,
     get_random_word,
+    get_word_profile,
+    close_wordnik_client,
+    WordOfTheDay,
+    RandomWordPool,
+    looks_like_word,
+    get_spelling_index,
+    load_spelling_index,
+    SPELLING_STRICT,
 )
 
 logger = generate_logger(__name__)
 
+# Examples are fetched a page at a time, up to a limit
+EXAMPLES_PER_PAGE = 5
+MAX_EXAMPLES = 50
+
 
 class WordPaginator(Pages):
     """Word of the Day Status Paginator."""
@@ -30,6 +45,34 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         """Initialisation for DictionaryCog instance."""
         self.bot = bot
 
+        # The word of the day is refreshed in the background and its embed
+        # is rendered once per day
+        self.word_of_the_day_embed = None
+        self.word_of_the_day = WordOfTheDay(on_update=self.render_word_of_the_day_embed)
+        self.word_of_the_day.start(self.bot.loop)
+
+        # Random words are prefetched in bulk, off the command hot path
+        self.random_words = RandomWordPool()
+        self.random_words.start(self.bot.loop)
+
+        # The spelling index is built off the event loop
+        self.bot.loop.run_in_executor(None, load_spelling_index)
+
+    def cog_unload(self):
+        """Releases the pooled Wordnik connections when the cog is unloaded."""
+        self.word_of_the_day.stop()
+        self.random_words.stop()
+        self.bot.loop.create_task(close_wordnik_client())
+
+    def render_word_of_the_day_embed(self, word_of_the_day):
+        """Pre-renders the embed of a new word of the day."""
+        # Wordnik sometimes publishes the word before its definitions
+        definitions = word_of_the_day.definitions
+        definition = definitions[0] if definitions else "No definition available yet."
+        self.word_of_the_day_embed = self.create_definition_embed(
+            word_of_the_day.word, definition
+        )
+
     def create_definition_embed(self, word, definition):
         """Creates an embed to show a word definition."""
         embed = discord.Embed(color=discord.Color.dark_purple())
@@ -84,15 +127,80 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         embed.timestamp = datetime.utcnow()
         return embed
 
+    def create_word_profile_entries(self, profile, max_definitions=5):
+        """Creates the (name, value) field entries to show a word profile."""
+        entries = []
+
+        for index, definition in enumerate(profile["definitions"][:max_definitions]):
+            entries.append((f"📖 Definition {index + 1}", definition[:1024]))
+
+        relationship_names = (
+            ("synonym", "Synonyms"),
+            ("antonym", "Antonyms"),
+            ("related-word", "Similar Words"),
+            ("rhyme", "Rhymes"),
+        )
+
+        for relationship_type, name in relationship_names:
+            words = profile.get(relationship_type)
+            if words:
+                entries.append((f"📖 {name}", ", ".join(words)[:1024]))
+
+        if entries and profile.get("partial"):
+            entries.append(
+                ("⏱️ Partial results", "Some results took too long and were left out.")
+            )
+
+        return entries
+
     def create_error_embed(self, message):
         """Creates an embed to display an error message."""
         embed = discord.Embed(color=discord.Color.red())
         embed.title = message
         return embed
 
+    def create_not_found_embed(self, message, word):
+        """Creates an error embed with spelling suggestions for a word."""
+        embed = self.create_error_embed(message)
+        suggestions = self.get_spelling_suggestions(word)
+
+        if suggestions:
+            suggestions_string = ", ".join(
+                f"`{suggestion}`" for suggestion in suggestions
+            )
+            embed.description = f"Did you mean: {suggestions_string}?"
+
+        return embed
+
+    def get_spelling_suggestions(self, word):
+        """Returns spelling suggestions for a word."""
+        index = get_spelling_index()
+        if word is None or index is None:
+            return []
+        return index.suggest(word)
+
+    def should_lookup(self, word):
+        """Checks if a word is worth looking up, without going upstream."""
+        if word is None or not looks_like_word(word):
+            return False
+
+        # The spelling index only holds single words
+        index = get_spelling_index()
+        if index is None or not word.isalpha() or word in index:
+            return True
+
+        # Unknown words one edit away from a known word are most likely typos,
+        # answered with suggestions only. Other unknown words may be rare
+        # words Wordnik knows, unless in strict mode
+        if SPELLING_STRICT:
+            return False
+        return not index.lookup(word, 1, max_edit_distance=1)
+
     # Class Methods
     async def cog_before_invoke(self, ctx):
         """A special method that acts as a cog local pre-invoke hook."""
+        # Every upstream call of the command shares its latency budget
+        set_deadline()
         await ctx.trigger_typing()
         return await super().cog_before_invoke(ctx)
 
@@ -128,8 +236,8 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     async def dictionary_definition(self, ctx, word=None):
         """Embeds a message with a word definition."""
         try:
-            if word is not None:
-                definition = get_definition(word)[0]
+            if self.should_lookup(word):
+                definition = (await get_definition(word))[0]
 
                 # Check if there is a definition for the word
                 if definition:
@@ -142,7 +250,7 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         except:
             message = f"Sorry, I could not find a definition for `{word}`."
             logger.error(message)
-            embed = self.create_error_embed(message)
+            embed = self.create_not_found_embed(message, word)
             await ctx.channel.send(embed=embed)
 
     @commands.guild_only()
@@ -155,8 +263,8 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     async def dictionary_synonym(self, ctx, word=None):
         """Provides a list of synonyms for the word given."""
         try:
-            if word is not None:
-                synonyms = get_synonyms(word)
+            if self.should_lookup(word):
+                synonyms = await get_synonyms(word)
 
                 # Check if there are synonyms for the word
                 if synonyms:
@@ -169,7 +277,7 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         except:
             message = f"Sorry, I could not find any synonyms for `{word}`."
             logger.error(message)
-            embed = self.create_error_embed(message)
+            embed = self.create_not_found_embed(message, word)
             await ctx.channel.send(embed=embed)
 
     @commands.guild_only()
@@ -182,8 +290,8 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     async def dictionary_antonym(self, ctx, word=None):
         """Provides a list of antonyms for the word given."""
         try:
-            if word is not None:
-                synonyms = get_antonyms(word)
+            if self.should_lookup(word):
+                synonyms = await get_antonyms(word)
 
                 # Check if there are synonyms for the word
                 if synonyms:
@@ -196,7 +304,7 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         except:
             message = f"Sorry, I could not find any antonyms for `{word}`."
             logger.error(message)
-            embed = self.create_error_embed(message)
+            embed = self.create_not_found_embed(message, word)
             await ctx.channel.send(embed=embed)
 
     @commands.guild_only()
@@ -209,8 +317,8 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     async def dictionary_similar(self, ctx, word=None):
         """Provides a list of words that have similar sound or spelling as the given word (homonyms/homographs)."""
         try:
-            if word is not None:
-                similar_words = get_similar_words(word)
+            if self.should_lookup(word):
+                similar_words = await get_similar_words(word)
 
                 # Check if there are similar words for the given word
                 if similar_words:
@@ -223,7 +331,7 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         except:
             message = f"Sorry, I could not find similar sounds or spelling words for `{word}`."
             logger.error(message)
-            embed = self.create_error_embed(message)
+            embed = self.create_not_found_embed(message, word)
             await ctx.channel.send(embed=embed)
 
     @commands.guild_only()
@@ -235,8 +343,8 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     async def dictionary_rhyme(self, ctx, word=None):
         """Provides a list of words that rhyme with the given word."""
         try:
-            if word is not None:
-                rhymes = get_rhymes(word)
+            if self.should_lookup(word):
+                rhymes = await get_rhymes(word)
                 if rhymes:
                     embed = self.create_rhyme_embed(word, rhymes)
                     await ctx.channel.send(embed=embed)
@@ -247,7 +355,69 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
         except:
             message = f"Sorry, I could not find any rhymes for `{word}`."
             logger.error(message)
-            embed = self.create_error_embed(message)
+            embed = self.create_not_found_embed(message, word)
+            await ctx.channel.send(embed=embed)
+
+    @commands.guild_only()
+    @dictionary.command(
+        name="all",
+        brief="Shows the definitions and all related words of a word.",
+        help="Shows the definitions, synonyms, antonyms, similar words and rhymes of a word.",
+    )
+    async def dictionary_all(self, ctx, word=None):
+        """Shows the definitions and all related words of a word."""
+        try:
+            if self.should_lookup(word):
+                profile = await get_word_profile(word)
+                entries = self.create_word_profile_entries(profile)
+
+                # Check if anything was found for the word
+                if entries:
+                    pages = FieldPages(ctx, entries=entries, per_page=4)
+                    pages.embed.title = f"📖 Everything about *{word}*"
+                    await pages.paginate()
+                else:
+                    raise Exception
+            else:
+                raise Exception
+        except:
+            message = f"Sorry, I could not find anything for `{word}`."
+            logger.error(message)
+            embed = self.create_not_found_embed(message, word)
+            await ctx.channel.send(embed=embed)
+
+    @commands.guild_only()
+    @dictionary.command(
+        name="examples",
+        aliases=["ex"],
+        brief="Shows sentences using the word given.",
+        help="Shows sentences using the word given, fetching them a page at a time.",
+    )
+    async def dictionary_examples(self, ctx, word=None):
+        """Shows sentences using the word given."""
+        try:
+            if self.should_lookup(word):
+
+                async def fetch_examples(skip, limit):
+                    return await get_word_examples(word, limit=limit, skip=skip)
+
+                source = PageSource(
+                    fetch_examples, per_page=EXAMPLES_PER_PAGE, max_entries=MAX_EXAMPLES
+                )
+
+                # Check if there are examples for the word
+                if await source.get_page(1):
+                    pages = Pages(ctx, source=source, per_page=EXAMPLES_PER_PAGE)
+                    pages.embed.title = f"📖 Examples for *{word}*"
+                    await pages.paginate()
+                else:
+                    raise Exception
+            else:
+                raise Exception
+        except:
+            message = f"Sorry, I could not find any examples for `{word}`."
+            logger.error(message)
+            embed = self.create_not_found_embed(message, word)
             await ctx.channel.send(embed=embed)
 
     @commands.guild_only()
@@ -259,9 +429,15 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     async def dictionary_word_of_the_day(self, ctx):
         """Shows the word of the day."""
         try:
-            word, definitions = get_word_of_the_day()
-            embed = self.create_definition_embed(word, definitions[0])
-            await ctx.channel.send(embed=embed)
+            # Served from memory, the word is fetched by a background task
+            embed = self.word_of_the_day_embed
+            if embed is not None:
+                # The embed is rendered once a day, but shows the request time
+                embed = embed.copy()
+                embed.timestamp = datetime.utcnow()
+                await ctx.channel.send(embed=embed)
+            else:
+                raise Exception
         except:
             message = "Sorry, could not get word of the day."
             logger.error(message)
@@ -277,10 +453,15 @@ class DictionaryCog(commands.Cog, name="Dictionary"):
     )
     async def dictionary_random_word(self, ctx):
         """Shows a random word with its definition."""
-        # Get a random word and its definition from the database
+        # Get a random word and its definition from the prefetched pool,
+        # or from the API if the pool has run dry
         try:
-            word = get_random_word()
-            definition = get_definition(word)[0]
+            entry = self.random_words.take()
+            if entry is not None:
+                word, definition = entry
+            else:
+                word = await get_random_word()
+                definition = (await get_definition(word))[0]
             embed = self.create_definition_embed(word, definition)
             await ctx.channel.send(embed=embed)
         except:
@@ -4,7 +4,13 @@ from datetime import datetime
 import discord
 from discord.ext import commands
 
-from util import generate_logger
+from util import (
+    generate_logger,
+    get_cache_stats,
+    get_upstream_states,
+    get_translation_memory_stats,
+    get_paginator_stats,
+)
 from config import BOT_INVITE_URL, SUPPORT_SERVER_INVITE_URL, VERSION
 
 logger = generate_logger(__name__)
@@ -108,6 +114,103 @@ class StatsCog(commands.Cog, name="Stats"):
         embed.timestamp = datetime.utcnow()
         return embed
 
+    def create_cache_stats_embed(self, cache_stats):
+        """Creates an embed to show the hit and miss counters of the caches."""
+        embed = discord.Embed(color=discord.Color.dark_purple())
+        embed.title = "🗄️ Cache Statistics"
+
+        for stats in cache_stats:
+            value = (
+                f"Entries: **{stats['memory_entries']}** in memory, "
+                f"**{stats['store_entries']}** on disk\n"
+                f"Size: **{stats['memory_bytes'] / 1024:.1f} KiB** in memory, "
+                f"**{stats['store_bytes'] / 1024:.1f} KiB** on disk\n"
+                f"Hits: **{stats['memory_hits']}** memory, "
+                f"**{stats['store_hits']}** disk\n"
+                f"Misses: **{stats['misses']}**\n"
+                f"Hit ratio: **{stats['hit_ratio']:.1%}**"
+            )
+            name = stats["name"].replace("_", " ").capitalize()
+            embed.add_field(name=name, value=value, inline=False)
+
+        embed.timestamp = datetime.utcnow()
+        return embed
+
+    def create_translation_memory_embed(self, memory_stats):
+        """Creates an embed to show how many segments the translation memory reused."""
+        embed = discord.Embed(color=discord.Color.dark_purple())
+        embed.title = "🧠 Translation Memory"
+        embed.description = (
+            f"Segments: **{memory_stats['segments']}** in memory, "
+            f"**{memory_stats['stored_segments']}** on disk\n"
+            f"Exact matches: **{memory_stats['exact_hits']}**\n"
+            f"Fuzzy matches: **{memory_stats['fuzzy_hits']}**\n"
+            f"Translated: **{memory_stats['misses']}**\n"
+            f"Hit ratio: **{memory_stats['hit_ratio']:.1%}**"
+        )
+        embed.timestamp = datetime.utcnow()
+        return embed
+
+    def create_paginator_stats_embed(self, paginator_stats):
+        """Creates an embed to show the paginator sessions and their reactions."""
+
+        def milliseconds(seconds):
+            return f"{seconds * 1000:.0f} ms" if seconds is not None else "n/a"
+
+        reaction_stats = paginator_stats["reactions"]
+        page_stats = paginator_stats["pages"]
+        embed = discord.Embed(color=discord.Color.dark_purple())
+        embed.title = "📑 Paginator Sessions"
+        embed.description = (
+            f"Open sessions: **{paginator_stats['sessions']}** "
+            f"({paginator_stats['users']} users)\n"
+            f"Expired: **{paginator_stats['expired']}**, "
+            f"evicted: **{paginator_stats['evicted']}**\n"
+            f"Time to interactive: "
+            f"**{milliseconds(paginator_stats['time_to_interactive_p50'])}** p50, "
+            f"**{milliseconds(paginator_stats['time_to_interactive_p95'])}** p95\n"
+            f"Time to controls: "
+            f"**{milliseconds(paginator_stats['time_to_controls_p50'])}** p50, "
+            f"**{milliseconds(paginator_stats['time_to_controls_p95'])}** p95\n"
+            f"Reactions: **{reaction_stats['added']}** added, "
+            f"**{reaction_stats['queued']}** queued, "
+            f"**{reaction_stats['dropped']}** dropped, "
+            f"**{reaction_stats['failed']}** failed\n"
+            f"Pages: **{page_stats['rendered']}** rendered, "
+            f"**{page_stats['memoized']}** reused\n"
+            f"Edits: **{page_stats['edited']}** sent, "
+            f"**{page_stats['unchanged']}** skipped"
+        )
+        embed.timestamp = datetime.utcnow()
+        return embed
+
+    def create_upstream_states_embed(self, upstream_states):
+        """Creates an embed to show the rate limiter and circuit breaker states."""
+        embed = discord.Embed(color=discord.Color.dark_purple())
+        embed.title = "🌐 Upstream APIs"
+
+        for state in upstream_states:
+            value = (
+                f"Circuit: **{state['circuit']}** "
+                f"({state['consecutive_failures']} consecutive failures)\n"
+                f"Tokens left: **{state['tokens']}**\n"
+                f"Calls: **{state['calls']}**, failures: **{state['failures']}**, "
+                f"rejected: **{state['rejected']}**"
+            )
+            if "hedged" in state:
+                p95_latency = state["p95_latency"]
+                p95_string = (
+                    f"{p95_latency * 1000:.0f} ms" if p95_latency is not None else "n/a"
+                )
+                value += (
+                    f"\np95 latency: **{p95_string}**, hedged: **{state['hedged']}** "
+                    f"(won: **{state['hedge_wins']}**)"
+                )
+            embed.add_field(name=state["name"].capitalize(), value=value, inline=False)
+
+        embed.timestamp = datetime.utcnow()
+        return embed
+
     # Class Methods
     async def cog_before_invoke(self, ctx):
         """A special method that acts as a cog local pre-invoke hook."""
@@ -179,6 +282,52 @@ class StatsCog(commands.Cog, name="Stats"):
         embed = self.create_join_embed(version, bot_invite_url, server_invite_url)
         await ctx.send(embed=embed)
 
+    @commands.is_owner()
+    @commands.command(
+        name="cachestats",
+        help="Shows the hit and miss counters of the lookup caches.",
+        hidden=True,
+    )
+    async def cache_stats(self, ctx):
+        """Shows the hit and miss counters of the lookup caches."""
+        embed = self.create_cache_stats_embed(await get_cache_stats())
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command(
+        name="upstreams",
+        help="Shows the rate limiter and circuit breaker state of the upstream APIs.",
+        hidden=True,
+    )
+    async def upstream_states(self, ctx):
+        """Shows the rate limiter and circuit breaker state of the upstream APIs."""
+        embed = self.create_upstream_states_embed(get_upstream_states())
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command(
+        name="tmstats",
+        help="Shows how many segments the translation memory reused.",
+        hidden=True,
+    )
+    async def translation_memory_stats(self, ctx):
+        """Shows how many segments the translation memory reused."""
+        embed = self.create_translation_memory_embed(
+            await get_translation_memory_stats()
+        )
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command(
+        name="sessions",
+        help="Shows the paginator sessions and how fast they become usable.",
+        hidden=True,
+    )
+    async def paginator_stats(self, ctx):
+        """Shows the paginator sessions and how fast they become usable."""
+        embed = self.create_paginator_stats_embed(get_paginator_stats())
+        await ctx.send(embed=embed)
+
 
 def setup(bot):
     """Sets up the stats cog for the bot."""
@@ -1,43 +1,33 @@
-import json
 from datetime import datetime
 
 import discord
 from discord.ext import commands
 
-from util import generate_logger, Pages, detect_language, list_languages, translate_text
-from config import LANGUAGES_PATH
+from util import (
+    generate_logger,
+    set_deadline,
+    Pages,
+    TextPages,
+    identify_language,
+    list_languages,
+    translate_long_text,
+    translate_with_memory,
+    translate_client,
+    Language,
+    LanguageIndex,
+    load_language_index,
+    AutoTranslateChannels,
+    AutoTranslator,
+)
+from config import LANGUAGES_PATH, COMMAND_PREFIX
 
 logger = generate_logger(__name__)
 
+# Auto-translated messages sent per embed
+AUTO_TRANSLATE_EMBED_FIELDS = 10
 
-class Language:
-    """Language class that represents a language used for translation."""
-
-    def __init__(self, language_name, language_code, country_flag):
-        """Initialisation for Language instance."""
-        self.language_name = language_name.lower()
-        self.language_code = language_code.lower()
-        self.country_flags = country_flag.lower()
-
-    def __str__(self):
-        """String representation of the object."""
-        return f"Language: {self.language_name}, Code: {self.language_code}, Flags: {self.country_flags}"
-
-    def __repr__(self):
-        """Object representation."""
-        return f"Language: {self.language_name}, Code: {self.language_code}, Flags: {self.country_flags}"
-
-    def __key(self):
-        """Base key for equality and hash methods."""
-        return (self.language_name, self.language_code, self.country_flags)
-
-    def __eq__(self, other):
-        """Check if a two languages are the same."""
-        return self.__key() == other.__key()
-
-    def __hash__(self):
-        """Returns the hash value of an instance."""
-        return hash(self.__key())
+# Texts longer than a translation chunk are translated in chunks and sent as pages
+LONG_TEXT_LENGTH = 1500
 
 
 class TranslateCog(commands.Cog, name="Translate"):
@@ -46,54 +36,42 @@ class TranslateCog(commands.Cog, name="Translate"):
     def __init__(self, bot):
         """Initialisation for TranslateCog instance."""
         self.bot = bot
-        self.langs_data = None
-        self.default_language = Language("English", "en", "🇺🇸")
-        self.supported_languages = self.load_languages()
+        self.languages = self.load_languages()
+        self.supported_languages = list(self.languages)
+        self.default_language = self.languages.get("en") or Language(
+            "English", "en", "🇺🇸"
+        )
+
+        # Keep the Translate API credentials fresh in the background
+        translate_client.start(self.bot.loop)
+
+        # Translate the messages of auto-translated channels in the background
+        self.auto_translate_channels = AutoTranslateChannels()
+        self.auto_translator = AutoTranslator(
+            on_translations=self.send_auto_translations
+        )
+        self.auto_translator.start(self.bot.loop)
+
+    def cog_unload(self):
+        """Stops the background credentials refresh and auto-translation."""
+        translate_client.stop()
+        self.auto_translator.stop()
 
     def load_languages(self):
         """Load the available languages for translation."""
-        langs = []
-
         try:
-            with open(LANGUAGES_PATH + ".json") as json_file:
-                data = json.load(json_file)
-                self.langs_data = data
-
-                for language in data["languages"]:
-
-                    new_lang = Language(
-                        language["name"],
-                        language["languageCode"],
-                        language["countryFlag"],
-                    )
-                    langs.append(new_lang)
-
-        except (FileNotFoundError, IOError) as e:
+            return load_language_index(LANGUAGES_PATH + ".json")
+        except (FileNotFoundError, IOError, ValueError, KeyError) as e:
             logger.error(e)
-
-        return langs
+            return LanguageIndex([])
 
     def is_language_supported(self, language):
-        if isinstance(language, Language):
-            return language in self.supported_languages
-        return False
+        """Whether a language is available for translation."""
+        return language in self.languages
 
     def create_language(self, language_text):
-        """Creates a Language class instance by using the langs data file."""
-        data = self.langs_data
-        language_instance = None
-
-        for language in data["languages"]:
-            if (
-                language["name"] == language_text.capitalize()
-                or language["languageCode"] == language_text.lower()
-                or language_text in language["countryFlag"]
-            ):
-                language_instance = Language(
-                    language["name"], language["languageCode"], language["countryFlag"]
-                )
-
-        return language_instance
+        """Finds the language matching a name, language code or country flag."""
+        return self.languages.get(language_text)
 
     def create_translate_list_embed(self, language_list):
         """Creates embed to show list of supported languages."""
@@ -135,15 +113,82 @@ class TranslateCog(commands.Cog, name="Translate"):
         embed.timestamp = datetime.utcnow()
         return embed
 
+    def create_auto_translate_embed(self, translations):
+        """Creates an embed to show the translations of several messages."""
+        embed = discord.Embed(color=discord.Color.dark_purple())
+
+        for message, translation in translations:
+            embed.add_field(
+                name=message.author.display_name,
+                value=translation[:1024],
+                inline=False,
+            )
+
+        embed.timestamp = datetime.utcnow()
+        return embed
+
     def create_error_embed(self, message):
         """Creates an embed to display an error message."""
         embed = discord.Embed(color=discord.Color.red())
         embed.title = message
         return embed
 
+    async def send_auto_translations(self, channel_id, translations):
+        """Sends the translations of an auto-translated channel's messages."""
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            return
+
+        for start in range(0, len(translations), AUTO_TRANSLATE_EMBED_FIELDS):
+            embed = self.create_auto_translate_embed(
+                translations[start : start + AUTO_TRANSLATE_EMBED_FIELDS]
+            )
+            await channel.send(embed=embed)
+
+    async def send_long_translation(self, ctx, language_code, text):
+        """Translates a long text in chunks, showing pages as chunks are ready."""
+        chunks = translate_long_text(language_code, text)
+        first_chunk = await chunks.__anext__()
+
+        pages = TextPages(ctx, first_chunk, prefix=None, suffix=None, complete=False)
+
+        async def add_remaining_chunks():
+            # The remaining chunks are translated after the command has answered
+            set_deadline(None)
+
+            try:
+                async for chunk in chunks:
+                    await pages.add_text(chunk)
+            except Exception as e:
+                logger.error(f"Could not translate the whole text: {e}")
+                await pages.add_text(
+                    "Sorry, I could not translate the rest of your text.",
+                    complete=True,
+                )
+            else:
+                await pages.add_text("", complete=True)
+
+        self.bot.loop.create_task(add_remaining_chunks())
+        await pages.paginate()
+
+    # Event Listeners
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        """Queues the messages of auto-translated channels for translation."""
+        if message.author.bot or message.guild is None or not message.content:
+            return
+
+        language_code = self.auto_translate_channels.get(message.channel.id)
+        if language_code is None or message.content.startswith(COMMAND_PREFIX):
+            return
+
+        self.auto_translator.submit(message, language_code)
+
     # Class Methods
     async def cog_before_invoke(self, ctx):
         """A special method that acts as a cog local pre-invoke hook."""
+        # Every upstream call of the command shares its latency budget
+        set_deadline()
         # Setup database connections
         await ctx.trigger_typing()
         return await super().cog_before_invoke(ctx)
@@ -190,8 +235,19 @@ class TranslateCog(commands.Cog, name="Translate"):
     async def translate_text(self, ctx, language=None, *, text: str = None):
         """Translate a sentence from one language to another."""
         try:
-            if language is not None and text is not None:
-                translation = translate_text(language, text)
+            # Codes missing from the data file are passed on to the API as they are
+            target_language = self.create_language(language)
+            if target_language is not None:
+                language_code = target_language.language_code
+            else:
+                language_code = language
+
+            if language_code is not None and text is not None:
+                if len(text) > LONG_TEXT_LENGTH:
+                    await self.send_long_translation(ctx, language_code, text)
+                    return
+
+                translation = await translate_with_memory(language_code, text)
                 author_name = ctx.author.name
                 author_img = ctx.author.avatar_url
 
@@ -208,12 +264,41 @@ class TranslateCog(commands.Cog, name="Translate"):
             embed = self.create_error_embed(message)
             await ctx.channel.send(embed=embed)
 
+    @commands.guild_only()
+    @commands.has_permissions(manage_channels=True)
+    @translator.command(
+        name="auto",
+        brief="Automatically translates every message of this channel.",
+        help="Automatically translates every message of this channel into a language. Use `off` to stop.",
+    )
+    async def translate_auto(self, ctx, language=None):
+        """Automatically translates every message of this channel."""
+        if language is not None and language.lower() == "off":
+            self.auto_translate_channels.disable(ctx.channel.id)
+            embed = discord.Embed(color=discord.Color.dark_purple())
+            embed.title = "Auto-translation disabled for this channel."
+            await ctx.channel.send(embed=embed)
+            return
+
+        target_language = self.create_language(language)
+        if target_language is None:
+            message = "Sorry, I could not find that language. Please make sure to provide a supported language."
+            await ctx.channel.send(embed=self.create_error_embed(message))
+            return
+
+        self.auto_translate_channels.enable(
+            ctx.channel.id, target_language.language_code
+        )
+        embed = discord.Embed(color=discord.Color.dark_purple())
+        embed.title = f"Messages in this channel will be translated into {target_language.language_name.capitalize()}."
+        await ctx.channel.send(embed=embed)
+
     @commands.guild_only()
     @translator.command(name="detect", help="Detects the language of a given message.")
     async def translate_detect(self, ctx, *, text: str = None):
         try:
             if text is not None:
-                detected_language = detect_language(text)
+                detected_language = await identify_language(text)
                 language = self.create_language(detected_language)
                 embed = self.create_translate_detect_embed(
                     text, language.language_name, language.language_code
@@ -1,4 +1,3 @@
-import asyncio
 import itertools
 
 import discord
@@ -77,14 +76,10 @@ class HelpPaginator(Pages):
         self.embed.set_footer(
             text=f"We were on page {self.current_page} before this message."
         )
-        await self.message.edit(embed=self.embed)
+        await self.display(None, self.embed)
 
         # Go back to previous page after 30 seconds
-        async def go_back_to_current_page():
-            await asyncio.sleep(30.0)
-            await self.show_current_page()
-
-        self.bot.loop.create_task(go_back_to_current_page())
+        self.schedule_restore(30.0)
 
     async def show_bot_help(self):
         """Shows how to use the bot."""
@@ -116,14 +111,10 @@ class HelpPaginator(Pages):
         self.embed.set_footer(
             text=f"We were on page {self.current_page} before this message."
         )
-        await self.message.edit(embed=self.embed)
+        await self.display(None, self.embed)
 
         # Go back to previous page after 30 seconds
-        async def go_back_to_current_page():
-            await asyncio.sleep(30.0)
-            await self.show_current_page()
-
-        self.bot.loop.create_task(go_back_to_current_page())
+        self.schedule_restore(30.0)
 
 
 class PaginatedHelpCommand(commands.HelpCommand):
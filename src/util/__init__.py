@@ -1,5 +1,6 @@
 from .logger import generate_logger
-from .paginator import Pages
+from .paginator import Pages, FieldPages, TextPages, get_paginator_stats
+from .page_source import PageSource
 from .dictionary import (
     get_word_examples,
     get_definition,
@@ -9,12 +10,39 @@ from .dictionary import (
     get_rhymes,
     get_word_of_the_day,
     get_random_word,
+    get_word_profile,
+)
+from .wordnik import WordnikError, close_wordnik_client
+from .cache import get_cache_stats
+from .resilience import UpstreamUnavailable, get_upstream_states
+from .deadlines import DeadlineExceeded, set_deadline
+from .word_of_the_day import WordOfTheDay
+from .random_words import RandomWordPool
+from .spelling import (
+    SPELLING_STRICT,
+    looks_like_word,
+    get_spelling_index,
+    load_spelling_index,
+)
+from .languages import Language, LanguageIndex, load_language_index
+from .translation_memory import translate_with_memory, get_translation_memory_stats
+from .auto_translate import AutoTranslateChannels, AutoTranslator
+from .translator import (
+    detect_language,
+    identify_language,
+    list_languages,
+    translate_text,
+    translate_long_text,
+    translate_client,
 )
-from .translator import detect_language, list_languages, translate_text
 
 __all__ = [
     "generate_logger",
     "Pages",
+    "FieldPages",
+    "TextPages",
+    "get_paginator_stats",
+    "PageSource",
     "get_word_examples",
     "get_definition",
     "get_synonyms",
@@ -23,7 +51,31 @@ __all__ = [
     "get_rhymes",
     "get_word_of_the_day",
     "get_random_word",
+    "get_word_profile",
+    "WordnikError",
+    "close_wordnik_client",
+    "get_cache_stats",
+    "UpstreamUnavailable",
+    "get_upstream_states",
+    "DeadlineExceeded",
+    "set_deadline",
+    "WordOfTheDay",
+    "RandomWordPool",
+    "SPELLING_STRICT",
+    "looks_like_word",
+    "get_spelling_index",
+    "load_spelling_index",
+    "translate_with_memory",
+    "get_translation_memory_stats",
+    "AutoTranslateChannels",
+    "AutoTranslator",
+    "Language",
+    "LanguageIndex",
+    "load_language_index",
     "detect_language",
+    "identify_language",
     "list_languages",
     "translate_text",
+    "translate_long_text",
+    "translate_client",
 ]
@@ -0,0 +1,282 @@
+import os
+import json
+import time
+import asyncio
+import functools
+from os.path import dirname, abspath, join
+
+from .language_detection import LANGUAGE_DETECTION_MIN_CONFIDENCE, language_detector
+from .logger import generate_logger
+from .translation_memory import translate_with_memory
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+AUTO_TRANSLATE_CHANNELS_PATH = os.getenv("AUTO_TRANSLATE_CHANNELS_PATH") or join(
+    BASE_PROJECT_PATH, "data", "settings", "auto_translate_channels.json"
+)
+
+# Bounds of the auto-translate work queue
+AUTO_TRANSLATE_QUEUE_SIZE = int(os.getenv("AUTO_TRANSLATE_QUEUE_SIZE", "500"))
+AUTO_TRANSLATE_CHANNEL_LIMIT = int(os.getenv("AUTO_TRANSLATE_CHANNEL_LIMIT", "50"))
+
+# Messages older than this (in seconds) when their turn comes are dropped
+AUTO_TRANSLATE_MAX_AGE = float(os.getenv("AUTO_TRANSLATE_MAX_AGE", "30"))
+
+logger = generate_logger(__name__)
+
+
+class AutoTranslateChannels:
+    """Target language of every auto-translated channel, persisted to disk."""
+
+    def __init__(self, path=AUTO_TRANSLATE_CHANNELS_PATH):
+        """Initialisation for AutoTranslateChannels instance."""
+        self.path = path
+        self.channels = {}
+        self.load()
+
+    def __contains__(self, channel_id):
+        return channel_id in self.channels
+
+    def get(self, channel_id):
+        """Returns the target language code of a channel, or None."""
+        return self.channels.get(channel_id)
+
+    def load(self):
+        """Loads the persisted channels."""
+        try:
+            with open(self.path) as json_file:
+                data = json.load(json_file)
+            self.channels = {int(key): value for key, value in data.items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Could not load the auto-translate channels: {e}")
+
+    def save(self):
+        """Persists the channels, atomically."""
+        os.makedirs(dirname(self.path), exist_ok=True)
+        temporary_path = self.path + ".tmp"
+
+        with open(temporary_path, "w") as json_file:
+            json.dump(
+                {str(key): value for key, value in self.channels.items()}, json_file
+            )
+
+        os.replace(temporary_path, self.path)
+
+    def enable(self, channel_id, language_code):
+        """Auto-translates a channel into a language."""
+        self.channels[channel_id] = language_code
+        self.save()
+
+    def disable(self, channel_id):
+        """Stops auto-translating a channel."""
+        if self.channels.pop(channel_id, None) is not None:
+            self.save()
+
+
+class AutoTranslator:
+    """Translates the messages of auto-translated channels in the background.
+
+    Messages are queued in a bounded work queue. A background task takes the
+    messages queued within a short delay as a batch, groups them by channel,
+    translates each distinct text only once, and hands every channel its
+    translations together. At most `max_batches` batches are translated at
+    the same time.
+
+    Work is shed instead of letting the bot fall behind: messages already
+    written in the target language are skipped, messages are dropped when
+    the queue or their channel's share of it is full, and messages that
+    waited too long in the queue are dropped.
+
+    Parameters
+    ------------
+    on_translations: Callable[[int, List[Tuple[Message, str]]], Awaitable]
+        Called with a channel id and the (message, translation) tuples of a
+        batch for that channel.
+    batch_size: int
+        Maximum number of messages taken from the queue at once.
+    batch_delay: float
+        Seconds to wait for more messages before translating a batch.
+    """
+
+    def __init__(
+        self,
+        *,
+        on_translations,
+        queue_size=AUTO_TRANSLATE_QUEUE_SIZE,
+        channel_limit=AUTO_TRANSLATE_CHANNEL_LIMIT,
+        max_age=AUTO_TRANSLATE_MAX_AGE,
+        batch_size=25,
+        batch_delay=0.5,
+        max_batches=2,
+    ):
+        """Initialisation for AutoTranslator instance."""
+        self.on_translations = on_translations
+        self.queue_size = queue_size
+        self.channel_limit = channel_limit
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_batches = max_batches
+        self.queue = None
+        self.task = None
+        self.batches = set()
+        self.queued_per_channel = {}
+
+        # Counters
+        self.translated = 0
+        self.deduplicated = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def submit(self, message, language_code):
+        """Queues a message to be translated into a language.
+
+        Returns False if the message was skipped or dropped.
+        """
+        if self.queue is None:
+            return False
+
+        detected_language, confidence = language_detector.detect(message.content)
+        if (
+            detected_language == language_code
+            and confidence >= LANGUAGE_DETECTION_MIN_CONFIDENCE
+        ):
+            self.skipped += 1
+            return False
+
+        channel_id = message.channel.id
+        if self.queued_per_channel.get(channel_id, 0) >= self.channel_limit:
+            self.dropped += 1
+            return False
+
+        try:
+            self.queue.put_nowait((time.monotonic(), message, language_code))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+        self.queued_per_channel[channel_id] = (
+            self.queued_per_channel.get(channel_id, 0) + 1
+        )
+        return True
+
+    async def take_batch(self):
+        """Waits for a message, then takes the messages queued shortly after it."""
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.batch_delay
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def translate_channel(self, channel_id, items):
+        """Translates the messages of a channel and hands over the translations."""
+        translations = {}
+        for _, message, language_code in items:
+            key = (message.content, language_code)
+            if key in translations:
+                self.deduplicated += 1
+            else:
+                translations[key] = asyncio.ensure_future(
+                    translate_with_memory(language_code, message.content)
+                )
+
+        await asyncio.gather(*translations.values(), return_exceptions=True)
+
+        results = []
+        for _, message, language_code in items:
+            task = translations[(message.content, language_code)]
+            if task.exception() is None:
+                results.append((message, task.result()))
+
+        self.translated += len(results)
+        if results:
+            await self.on_translations(channel_id, results)
+
+    async def process(self, batch):
+        """Translates a batch of queued messages, channel by channel."""
+        channels = {}
+        now = time.monotonic()
+
+        for item in batch:
+            queued_at, message, _ = item
+            channel_id = message.channel.id
+            remaining = self.queued_per_channel.get(channel_id, 1) - 1
+            if remaining > 0:
+                self.queued_per_channel[channel_id] = remaining
+            else:
+                self.queued_per_channel.pop(channel_id, None)
+
+            if now - queued_at > self.max_age:
+                self.dropped += 1
+            else:
+                channels.setdefault(channel_id, []).append(item)
+
+        results = await asyncio.gather(
+            *(
+                self.translate_channel(channel_id, items)
+                for channel_id, items in channels.items()
+            ),
+            return_exceptions=True,
+        )
+
+        for channel_id, result in zip(channels, results):
+            if isinstance(result, Exception):
+                logger.error(f"Could not auto-translate channel {channel_id}: {result}")
+
+    def batch_done(self, slots, task):
+        """Frees the slot of a translated batch."""
+        self.batches.discard(task)
+        slots.release()
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Could not auto-translate messages: {task.exception()}")
+
+    async def run(self):
+        """Takes batches of queued messages and translates them until stopped."""
+        slots = asyncio.Semaphore(self.max_batches)
+
+        while True:
+            batch = await self.take_batch()
+
+            # Messages keep queueing up (or being dropped) while every slot is busy
+            await slots.acquire()
+            task = asyncio.ensure_future(self.process(batch))
+            task.add_done_callback(functools.partial(self.batch_done, slots))
+            self.batches.add(task)
+
+    def start(self, loop):
+        """Starts the background task."""
+        if self.task is None or self.task.done():
+            self.queue = asyncio.Queue(self.queue_size)
+            self.task = loop.create_task(self.run())
+
+    def stop(self):
+        """Stops the background task, dropping the queued messages."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        for task in list(self.batches):
+            task.cancel()
+
+        self.queue = None
+        self.queued_per_channel.clear()
+
+    def stats(self):
+        """Returns the auto-translate counters."""
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "translated": self.translated,
+            "deduplicated": self.deduplicated,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,127 @@
+import asyncio
+
+
+class Batch:
+    """Values waiting to be sent together, with the futures of their callers."""
+
+    def __init__(self, handle):
+        """Initialisation for Batch instance."""
+        self.values = []
+        self.futures = []
+        self.cost = 0
+        self.handle = handle
+
+
+class MicroBatcher:
+    """Groups concurrent calls arriving within a short delay into one request.
+
+    Callers submit a single value under a key (for instance the target
+    language and model of a translation). Values submitted for the same key
+    within `max_delay` seconds are handed to `handler(key, values)` at once,
+    which must return one result per value, in order. Each caller gets its
+    own result, or the exception raised by the handler.
+
+    Parameters
+    ------------
+    handler: Callable[[Hashable, List], Awaitable[List]]
+        Coroutine function sending a whole batch upstream.
+    max_delay: float
+        Seconds to wait for more values before sending a batch.
+    max_batch_size: int
+        Maximum number of values per batch.
+    max_batch_cost: int
+        Maximum total cost of the values of a batch, as measured by `cost`.
+        A single value is always sent, even if it exceeds this cost.
+    """
+
+    def __init__(
+        self,
+        name,
+        handler,
+        *,
+        max_delay=0.005,
+        max_batch_size=128,
+        max_batch_cost=None,
+        cost=len,
+    ):
+        """Initialisation for MicroBatcher instance."""
+        self.name = name
+        self.handler = handler
+        self.max_delay = max_delay
+        self.max_batch_size = max_batch_size
+        self.max_batch_cost = max_batch_cost
+        self.cost = cost
+        self.pending = {}
+
+        # Counters
+        self.batches = 0
+        self.values = 0
+
+    async def submit(self, key, value):
+        """Adds a value to the batch of a key and waits for its result."""
+        loop = asyncio.get_event_loop()
+        cost = self.cost(value)
+
+        batch = self.pending.get(key)
+        if (
+            batch is not None
+            and self.max_batch_cost is not None
+            and batch.cost + cost > self.max_batch_cost
+        ):
+            self.flush(key)
+            batch = None
+
+        if batch is None:
+            batch = Batch(loop.call_later(self.max_delay, self.flush, key))
+            self.pending[key] = batch
+
+        future = loop.create_future()
+        batch.values.append(value)
+        batch.futures.append(future)
+        batch.cost += cost
+
+        if len(batch.values) >= self.max_batch_size:
+            self.flush(key)
+
+        return await future
+
+    def flush(self, key):
+        """Sends the pending batch of a key."""
+        batch = self.pending.pop(key, None)
+        if batch is None:
+            return
+
+        batch.handle.cancel()
+        asyncio.ensure_future(self.dispatch(key, batch))
+
+    async def dispatch(self, key, batch):
+        """Sends a batch and resolves the future of every caller."""
+        self.batches += 1
+        self.values += len(batch.values)
+
+        try:
+            results = await self.handler(key, batch.values)
+            if len(results) != len(batch.values):
+                raise ValueError(
+                    f"{self.name} returned {len(results)} results "
+                    f"for {len(batch.values)} values"
+                )
+        except Exception as error:
+            for future in batch.futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for future, result in zip(batch.futures, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """Returns the batching counters."""
+        return {
+            "name": self.name,
+            "pending": sum(len(batch.values) for batch in self.pending.values()),
+            "batches": self.batches,
+            "values": self.values,
+            "average_batch_size": self.values / self.batches if self.batches else 0.0,
+        }
@@ -0,0 +1,526 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import inspect
+import functools
+import threading
+from os.path import dirname, abspath, join
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .logger import generate_logger
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+CACHE_PATH = os.getenv("CACHE_PATH") or join(BASE_PROJECT_PATH, "data", "cache")
+
+# Seconds writes to the persistent stores are gathered for, to commit them together
+CACHE_WRITE_DELAY = float(os.getenv("CACHE_WRITE_DELAY", "0.05"))
+
+# Sentinel returned when a key is not cached
+MISSING = object()
+
+logger = generate_logger(__name__)
+
+# Every tiered cache created by the bot, by name
+caches = {}
+
+
+class LRUCache:
+    """Bounded in-memory cache with least recently used eviction.
+
+    The cache is bounded by its number of entries and, optionally, by the
+    total size in bytes of its entries. Every entry carries its own expiry
+    timestamp. Expired entries are kept until they are evicted, so they can
+    still be served as stale values.
+    """
+
+    def __init__(self, max_size=1024, max_bytes=None):
+        """Initialisation for LRUCache instance."""
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, allow_stale=False):
+        """Returns the value stored for a key or MISSING."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return MISSING
+
+        value, expires_at, _ = entry
+        if not allow_stale and expires_at is not None and expires_at <= time.time():
+            return MISSING
+
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at=None, size=0):
+        """Stores a value, evicting the least recently used entries if full."""
+        self.delete(key)
+        self.entries[key] = (value, expires_at, size)
+        self.bytes += size
+
+        while len(self.entries) > self.max_size or (
+            self.max_bytes is not None
+            and self.bytes > self.max_bytes
+            and len(self.entries) > 1
+        ):
+            _, (_, _, evicted_size) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def delete(self, key):
+        """Removes a key from the cache."""
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def clear(self):
+        """Removes every entry from the cache."""
+        self.entries.clear()
+        self.bytes = 0
+
+
+class SQLiteStore:
+    """Persistent key-value store backed by a local SQLite file.
+
+    Values are stored as JSON. Rows expired for longer than `stale_period`
+    seconds are purged periodically, and once the store grows past
+    `max_entries` rows or `max_bytes` bytes the oldest rows are purged too.
+
+    The database is opened on first use. Every query runs on a thread of
+    the store's own, so the event loop never waits for the disk: writes are
+    queued and committed in batches, one transaction per batch, and reads
+    are awaited. Queued writes are visible to reads right away.
+    """
+
+    def __init__(
+        self,
+        path,
+        *,
+        table="cache",
+        max_entries=100000,
+        max_bytes=None,
+        purge_every=500,
+        stale_period=7 * 24 * 60 * 60,
+        write_delay=CACHE_WRITE_DELAY,
+    ):
+        """Initialisation for SQLiteStore instance."""
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.purge_every = purge_every
+        self.stale_period = stale_period
+        self.write_delay = write_delay
+        self.writes = 0
+
+        self.connection = None
+        self.lock = threading.Lock()
+
+        # A single thread runs the queries in order, so a read sent after a
+        # batch of writes sees them
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"sqlite-{table}"
+        )
+
+        # Writes not sent to the database thread yet, by key (None to delete)
+        self.pending = OrderedDict()
+        self.flush_handle = None
+
+    def connect(self):
+        """Returns the database connection, opening it if needed."""
+        with self.lock:
+            if self.connection is None:
+                self.connection = self.open()
+            return self.connection
+
+    def open(self):
+        """Opens the database, creating its table if needed."""
+        if self.path != ":memory:":
+            os.makedirs(dirname(abspath(self.path)), exist_ok=True)
+
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, created_at REAL NOT NULL, "
+            "size INTEGER NOT NULL DEFAULT 0)"
+        )
+
+        # Tables created before sizes were tracked
+        columns = [
+            row[1] for row in connection.execute(f"PRAGMA table_info({self.table})")
+        ]
+        if "size" not in columns:
+            connection.execute(
+                f"ALTER TABLE {self.table} "
+                "ADD COLUMN size INTEGER NOT NULL DEFAULT 0"
+            )
+
+        connection.commit()
+        return connection
+
+    async def run(self, func, *args):
+        """Runs a blocking function on the database thread."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def decode(self, row, allow_stale):
+        """Returns the (value, expires_at) tuple of a row, or MISSING."""
+        if row is None:
+            return MISSING
+
+        encoded, expires_at = row
+        if not allow_stale and expires_at is not None and expires_at <= time.time():
+            return MISSING
+
+        return json.loads(encoded), expires_at
+
+    def read(self, key, allow_stale=False):
+        """Returns a (value, expires_at) tuple or MISSING, blocking on the database."""
+        row = (
+            self.connect()
+            .execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            )
+            .fetchone()
+        )
+        return self.decode(row, allow_stale)
+
+    async def get(self, key, allow_stale=False):
+        """Returns a (value, expires_at) tuple or MISSING."""
+        if key in self.pending:
+            row = self.pending[key]
+            return self.decode(row and row[:2], allow_stale)
+
+        return await self.run(self.read, key, allow_stale)
+
+    def set(self, key, value, expires_at=None, encoded=None):
+        """Queues a value to store, optionally already encoded as JSON."""
+        encoded = encoded if encoded is not None else json.dumps(value)
+        self.queue(key, (encoded, expires_at, time.time(), len(key) + len(encoded)))
+
+    def delete(self, key):
+        """Queues the removal of a key from the store."""
+        self.queue(key, None)
+
+    def queue(self, key, row):
+        """Queues a write, flushed with the others after a short delay."""
+        self.pending.pop(key, None)
+        self.pending[key] = row
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Outside of the event loop, there is nothing to block
+            self.write(self.take_pending())
+            return
+
+        if self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.write_delay, self.flush)
+
+    def take_pending(self):
+        """Returns the queued writes, emptying the queue."""
+        batch, self.pending = self.pending, OrderedDict()
+        return batch
+
+    def flush(self):
+        """Sends the queued writes to the database thread."""
+        self.flush_handle = None
+        if self.pending:
+            future = self.executor.submit(self.write, self.take_pending())
+            future.add_done_callback(self.log_write_error)
+
+    def log_write_error(self, future):
+        """Logs the failure of a batch of writes."""
+        if future.exception() is not None:
+            logger.error(f"Could not write to {self.table}: {future.exception()}")
+
+    def write(self, batch):
+        """Writes a batch of queued writes in one transaction."""
+        connection = self.connect()
+        rows = [(key, *row) for key, row in batch.items() if row is not None]
+        deleted = [(key,) for key, row in batch.items() if row is None]
+
+        with connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, expires_at, created_at, size) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", deleted)
+
+        writes, self.writes = self.writes, self.writes + len(rows)
+        if writes // self.purge_every != self.writes // self.purge_every:
+            self.purge()
+
+    def purge(self):
+        """Removes stale rows and the oldest rows above the size limit."""
+        connection = self.connect()
+        connection.execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time() - self.stale_period,),
+        )
+        (count,) = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+
+        if count > self.max_entries:
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY created_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+        excess = self.size() - self.max_bytes if self.max_bytes is not None else 0
+        if excess > 0:
+            keys = []
+            rows = connection.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY created_at"
+            )
+            for key, size in rows:
+                if excess <= 0:
+                    break
+                keys.append((key,))
+                excess -= size
+
+            connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", keys)
+
+        connection.commit()
+
+    def __len__(self):
+        (count,) = (
+            self.connect().execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        )
+        return count
+
+    def size(self):
+        """Returns the total size in bytes of the stored rows."""
+        (size,) = (
+            self.connect()
+            .execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}")
+            .fetchone()
+        )
+        return size
+
+    async def counts(self):
+        """Returns the number of rows and their total size in bytes."""
+        return await self.run(lambda: (len(self), self.size()))
+
+    def close(self):
+        """Writes the queued writes and closes the database connection."""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        self.executor.submit(self.write, self.take_pending())
+        self.executor.shutdown(wait=True)
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class TieredCache:
+    """Two-tier cache with an in-memory LRU in front of a persistent store.
+
+    Reads are served from memory when possible, otherwise from the store,
+    in which case the entry is promoted back into memory.
+    """
+
+    def __init__(
+        self, name, *, memory_size=1024, memory_bytes=None, store=None, default_ttl=None
+    ):
+        """Initialisation for TieredCache instance."""
+        self.name = name
+        self.memory = LRUCache(memory_size, memory_bytes)
+        self.store = store
+        self.default_ttl = default_ttl
+
+        # Hit and miss counters
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+        caches[name] = self
+
+    async def get(self, key):
+        """Returns the value stored for a key or MISSING."""
+        value = self.memory.get(key)
+        if value is not MISSING:
+            self.memory_hits += 1
+            return value
+
+        if self.store is not None:
+            entry = await self.store.get(key)
+            if entry is not MISSING:
+                value, expires_at = entry
+                self.memory.set(key, value, expires_at)
+                self.store_hits += 1
+                return value
+
+        self.misses += 1
+        return MISSING
+
+    async def get_stale(self, key):
+        """Returns the value stored for a key even if it has expired, or MISSING."""
+        value = self.memory.get(key, allow_stale=True)
+
+        if value is MISSING and self.store is not None:
+            entry = await self.store.get(key, allow_stale=True)
+            if entry is not MISSING:
+                value = entry[0]
+
+        if value is not MISSING:
+            self.stale_hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Stores a value in both tiers."""
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        encoded = json.dumps(value)
+
+        self.memory.set(key, value, expires_at, len(key) + len(encoded))
+        if self.store is not None:
+            self.store.set(key, value, expires_at, encoded)
+
+    def delete(self, key):
+        """Removes a key from both tiers."""
+        self.memory.delete(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    async def stats(self):
+        """Returns the cache counters."""
+        hits = self.memory_hits + self.store_hits
+        lookups = hits + self.misses
+        store_entries, store_bytes = (
+            await self.store.counts() if self.store is not None else (0, 0)
+        )
+
+        return {
+            "name": self.name,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.bytes,
+            "store_entries": store_entries,
+            "store_bytes": store_bytes,
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def get_signature(func):
+    """Returns the (memoized) signature of a function."""
+    return inspect.signature(func)
+
+
+def make_key(func, args, kwargs):
+    """Builds a cache key from a function and its bound arguments."""
+    bound = get_signature(func).bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = json.dumps(bound.arguments, sort_keys=True, default=str)
+    return f"{func.__name__}:{arguments}"
+
+
+def cached(
+    cache,
+    ttl=None,
+    *,
+    negative_cache=None,
+    negative_ttl=None,
+    is_not_found=None,
+    empty=list,
+    stale_on_error=False,
+    key_func=None,
+):
+    """Decorator that caches the results of a coroutine function.
+
+    When a negative cache is given, "not found" outcomes (empty results, or
+    exceptions matching `is_not_found`) are stored there with their own,
+    usually shorter, time to live, and answered with an `empty()` value
+    until they expire.
+
+    Keys are built from the bound arguments, unless a `key_func` taking the
+    same arguments as the function is given.
+
+    With `stale_on_error`, an expired value is served when the call fails,
+    which keeps answering while the upstream is down or rate limited.
+
+    The decorated function exposes `cache_key`, `peek` and `prime` helpers,
+    so results fetched elsewhere can be stored under the same key.
+    """
+
+    def decorator(func):
+        def build_key(args, kwargs):
+            if key_func is not None:
+                return key_func(*args, **kwargs)
+            return make_key(func, args, kwargs)
+
+        def store(key, value):
+            if not value and negative_cache is not None:
+                negative_cache.set(key, True, negative_ttl)
+            else:
+                cache.set(key, value, ttl)
+
+        async def lookup(key):
+            value = await cache.get(key)
+            if value is MISSING and negative_cache is not None:
+                if await negative_cache.get(key) is not MISSING:
+                    return empty()
+            return value
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = build_key(args, kwargs)
+
+            value = await lookup(key)
+            if value is not MISSING:
+                return value
+
+            try:
+                value = await func(*args, **kwargs)
+            except Exception as error:
+                if is_not_found is not None and is_not_found(error):
+                    value = empty()
+                elif stale_on_error:
+                    value = await cache.get_stale(key)
+                    if value is MISSING:
+                        raise
+                    return value
+                else:
+                    raise
+
+            store(key, value)
+            return value
+
+        def cache_key(*args, **kwargs):
+            return build_key(args, kwargs)
+
+        async def peek(*args, **kwargs):
+            return await lookup(build_key(args, kwargs))
+
+        def prime(value, *args, **kwargs):
+            store(build_key(args, kwargs), value)
+
+        wrapper.cache = cache
+        wrapper.cache_key = cache_key
+        wrapper.peek = peek
+        wrapper.prime = prime
+        return wrapper
+
+    return decorator
+
+
+async def get_cache_stats():
+    """Returns the counters of every registered cache."""
+    return [await cache.stats() for cache in caches.values()]
@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Latency budget (in seconds) of a command, shared by all its upstream calls
+COMMAND_DEADLINE = float(os.getenv("COMMAND_DEADLINE", "8"))
+
+# Time kept to render partial results once sub-lookups run out of time
+PARTIAL_RESULTS_RESERVE = float(os.getenv("PARTIAL_RESULTS_RESERVE", "0.25"))
+
+# Monotonic time at which the current command gives up, or None
+current_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """Raised when the latency budget of a command runs out."""
+
+
+def set_deadline(budget=COMMAND_DEADLINE):
+    """Gives the current task a latency budget, in seconds (None for no budget).
+
+    Tasks started afterwards from the current task inherit the deadline.
+    """
+    current_deadline.set(time.monotonic() + budget if budget is not None else None)
+
+
+@contextmanager
+def reserve_time(seconds=PARTIAL_RESULTS_RESERVE):
+    """Brings the deadline forward within the block, keeping time to use partial results.
+
+    Sub-lookups started within the block give up `seconds` before the
+    command does, so the results of the others can still be shown.
+    """
+    deadline = current_deadline.get()
+    token = current_deadline.set(deadline - seconds if deadline is not None else None)
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining_time():
+    """Returns the seconds left before the current deadline, or None."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+async def within_deadline(awaitable):
+    """Awaits an awaitable, cancelling it once the current deadline passes."""
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded()
+
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError:
+        if remaining_time() > 0:
+            raise
+        raise DeadlineExceeded() from None
+
+
+class LatencyTracker:
+    """Latencies of the latest successful calls, for percentile estimates.
+
+    Percentiles are only estimated once `min_samples` latencies are known.
+    """
+
+    def __init__(self, size=200, min_samples=20):
+        """Initialisation for LatencyTracker instance."""
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self.sorted_samples = None
+
+    def __len__(self):
+        return len(self.samples)
+
+    def record(self, latency):
+        """Records the latency of a call, in seconds."""
+        self.samples.append(latency)
+        self.sorted_samples = None
+
+    def percentile(self, percentile):
+        """Returns a latency percentile (between 0 and 1), or None."""
+        if len(self.samples) < self.min_samples:
+            return None
+
+        if self.sorted_samples is None:
+            self.sorted_samples = sorted(self.samples)
+
+        index = min(
+            len(self.sorted_samples) - 1, int(percentile * len(self.sorted_samples))
+        )
+        return self.sorted_samples[index]
+
+
+class Hedger:
+    """Sends a duplicate of slow idempotent calls, the first answer wins.
+
+    Once a call has been running longer than the `percentile` latency of
+    the latest calls, a second identical call is started, unless the
+    current deadline would pass before it could answer. Whichever call
+    succeeds first is returned and the other one is cancelled; the error
+    is only raised if both calls fail.
+
+    Parameters
+    ------------
+    percentile: float
+        Latency percentile (between 0 and 1) after which a call is hedged.
+    enabled: bool
+        Whether calls are hedged, latencies are tracked either way.
+    """
+
+    def __init__(self, name, *, percentile=0.95, enabled=True, window=200):
+        """Initialisation for Hedger instance."""
+        self.name = name
+        self.percentile = percentile
+        self.enabled = enabled
+        self.latencies = LatencyTracker(window)
+
+        # Counters
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self):
+        """Returns the seconds after which a call is hedged, or None."""
+        if not self.enabled:
+            return None
+
+        delay = self.latencies.percentile(self.percentile)
+        remaining = remaining_time()
+        if delay is None or (remaining is not None and remaining <= delay):
+            return None
+        return delay
+
+    async def attempt(self, func, *args, **kwargs):
+        """Makes a call, recording its latency if it succeeds."""
+        started_at = time.monotonic()
+        result = await func(*args, **kwargs)
+        self.latencies.record(time.monotonic() - started_at)
+        return result
+
+    async def call(self, func, *args, **kwargs):
+        """Calls a coroutine function, hedging it if it is slow."""
+        self.calls += 1
+        delay = self.hedge_delay()
+        first = asyncio.ensure_future(self.attempt(func, *args, **kwargs))
+
+        if delay is None:
+            return await first
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedged += 1
+                tasks.append(asyncio.ensure_future(self.attempt(func, *args, **kwargs)))
+
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self):
+        """Returns the hedging counters."""
+        p95 = self.latencies.percentile(0.95)
+        return {
+            "p95_latency": p95,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
@@ -1,23 +1,165 @@
 import os
-from datetime import datetime
-
-from wordnik import swagger, WordApi, WordsApi
-
-WORDNIK_API_KEY = os.getenv("WORDNIK_API_KEY")
-WORDNIK_API_URL = os.getenv("WORDNIK_API_URL")
-
-client = swagger.ApiClient(WORDNIK_API_KEY, WORDNIK_API_URL)
-
-
-def get_word_examples(
+import asyncio
+import functools
+from os.path import join
+from datetime import datetime, timezone
+
+from .cache import (
+    CACHE_PATH,
+    MISSING,
+    TieredCache,
+    SQLiteStore,
+    cached,
+    get_signature,
+)
+from .deadlines import reserve_time
+from .lexicon import local_dictionary
+from .singleflight import SingleFlight, coalesced
+from .wordnik import WordnikError, client
+
+DICTIONARY_CACHE_SIZE = int(os.getenv("DICTIONARY_CACHE_SIZE", "2048"))
+DICTIONARY_CACHE_MAX_ENTRIES = int(os.getenv("DICTIONARY_CACHE_MAX_ENTRIES", "100000"))
+
+# Words without definitions or relations are remembered separately
+DICTIONARY_NEGATIVE_CACHE_SIZE = int(
+    os.getenv("DICTIONARY_NEGATIVE_CACHE_SIZE", "1024")
+)
+DICTIONARY_NEGATIVE_CACHE_MAX_ENTRIES = int(
+    os.getenv("DICTIONARY_NEGATIVE_CACHE_MAX_ENTRIES", "20000")
+)
+
+DAY = 60 * 60 * 24
+
+
+def cache_ttl(name, default):
+    """Reads the cache time to live (in seconds) of a lookup type."""
+    return float(os.getenv(f"DICTIONARY_CACHE_TTL_{name.upper()}", default))
+
+
+# Time to live for every type of lookup
+CACHE_TTLS = {
+    "examples": cache_ttl("examples", 7 * DAY),
+    "definition": cache_ttl("definition", 30 * DAY),
+    "synonym": cache_ttl("synonym", 30 * DAY),
+    "antonym": cache_ttl("antonym", 30 * DAY),
+    "related-word": cache_ttl("related_word", 14 * DAY),
+    "rhyme": cache_ttl("rhyme", 90 * DAY),
+    "not_found": cache_ttl("not_found", DAY),
+}
+
+cache = TieredCache(
+    "dictionary",
+    memory_size=DICTIONARY_CACHE_SIZE,
+    store=SQLiteStore(
+        join(CACHE_PATH, "dictionary.sqlite3"),
+        max_entries=DICTIONARY_CACHE_MAX_ENTRIES,
+    ),
+)
+
+negative_cache = TieredCache(
+    "dictionary_not_found",
+    memory_size=DICTIONARY_NEGATIVE_CACHE_SIZE,
+    store=SQLiteStore(
+        join(CACHE_PATH, "dictionary.sqlite3"),
+        table="not_found",
+        max_entries=DICTIONARY_NEGATIVE_CACHE_MAX_ENTRIES,
+    ),
+)
+
+
+def is_not_found(error):
+    """Whether an error means Wordnik does not know the word."""
+    return isinstance(error, WordnikError) and error.status == 404
+
+
+def cached_lookup(lookup_type):
+    """Caches a lookup, with its "not found" outcomes in the negative cache.
+
+    Expired results are served when Wordnik fails, is rate limited or has
+    its circuit open.
+    """
+    return cached(
+        cache,
+        ttl=CACHE_TTLS[lookup_type],
+        negative_cache=negative_cache,
+        negative_ttl=CACHE_TTLS["not_found"],
+        is_not_found=is_not_found,
+        stale_on_error=True,
+    )
+
+
+# Local dictionary backend mode: "primary", "fallback" or "disabled"
+DICTIONARY_LOCAL_MODE = (os.getenv("DICTIONARY_LOCAL_MODE") or "fallback").lower()
+
+
+def with_local_backend(method_name):
+    """Decorator that serves a lookup from the local dictionary.
+
+    In primary mode the local dictionary is queried first and Wordnik is only
+    used for words it does not know. In fallback mode Wordnik is queried
+    first and the local dictionary answers when Wordnik fails or finds
+    nothing.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if DICTIONARY_LOCAL_MODE == "disabled":
+                return await func(*args, **kwargs)
+
+            bound = get_signature(func).bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            def local_lookup():
+                return getattr(local_dictionary, method_name)(**bound.arguments)
+
+            if DICTIONARY_LOCAL_MODE == "primary":
+                result = local_lookup()
+                if result is not None:
+                    return result
+                return await func(*args, **kwargs)
+
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                result = local_lookup()
+                if result is None:
+                    raise
+                return result
+
+            if not result:
+                local_result = local_lookup()
+                if local_result is not None:
+                    return local_result
+
+            # Fill the parts of a word profile that Wordnik could not provide
+            elif isinstance(result, dict):
+                local_result = local_lookup() or {}
+                result = {
+                    key: value or local_result.get(key, value)
+                    for key, value in result.items()
+                }
+
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+# Concurrent identical lookups share a single Wordnik request
+wordnik_calls = SingleFlight("wordnik")
+
+
+@cached_lookup("examples")
+@coalesced(wordnik_calls)
+async def get_word_examples(
     word, include_duplicates=False, use_canonical=False, limit=5, skip=None
 ):
     """Returns sentences examples for a word."""
-    word_client = WordApi.WordApi(client)
 
     # Create dictionary for keyword arguments
     data = {
-        "word": word,
         "includeDuplicates": include_duplicates,
         "useCanonical": use_canonical,
         "limit": limit,
@@ -26,13 +168,16 @@ def get_word_examples(
     if skip is not None:
         data["skip"] = skip
 
-    examples = word_client.getExamples(**data).examples
-    examples_list = [example.text for example in examples]
+    examples = (await client.get_examples(word, **data)).get("examples", [])
+    examples_list = [example["text"] for example in examples]
 
     return examples_list
 
 
-def get_definition(
+@with_local_backend("get_definition")
+@cached_lookup("definition")
+@coalesced(wordnik_calls)
+async def get_definition(
     word,
     limit=200,
     include_related=False,
@@ -41,13 +186,10 @@ def get_definition(
     include_tags=False,
     part_of_speech=None,
 ):
-
     """Returns word definitions."""
-    word_client = WordApi.WordApi(client)
 
     # Create dictionary for keyword arguments
     data = {
-        "word": word,
         "limit": limit,
         "includeRelated": include_related,
         "sourceDictionaries": source_dictionaries,
@@ -58,105 +200,211 @@ def get_definition(
     if part_of_speech is not None:
         data["partOfSpeech"] = part_of_speech
 
-    definitions = word_client.getDefinitions(**data)
+    definitions = await client.get_definitions(word, **data)
     definitions_list = [
-        definition.text for definition in definitions if definition.text != None
+        definition["text"]
+        for definition in definitions
+        if definition.get("text") is not None
     ]
 
     return definitions_list
 
 
-def get_synonyms(word, use_canonical=False, limit_per_relationship_type=10):
+@with_local_backend("get_synonyms")
+@cached_lookup("synonym")
+@coalesced(wordnik_calls)
+async def get_synonyms(word, use_canonical=False, limit_per_relationship_type=10):
     """Returns word synonyms."""
-    word_client = WordApi.WordApi(client)
-
     data = {
-        "word": word,
         "useCanonical": use_canonical,
         "relationshipTypes": "synonym",
         "limitPerRelationshipType": limit_per_relationship_type,
     }
 
-    synonyms = word_client.getRelatedWords(**data)
-    synonyms_list = synonyms[0].words
+    synonyms = await client.get_related_words(word, **data)
+    synonyms_list = synonyms[0]["words"] if synonyms else []
 
     return synonyms_list
 
 
-def get_antonyms(word, use_canonical=False, limit_per_relationship_type=10):
+@with_local_backend("get_antonyms")
+@cached_lookup("antonym")
+@coalesced(wordnik_calls)
+async def get_antonyms(word, use_canonical=False, limit_per_relationship_type=10):
     """Returns word antonyms."""
-    word_client = WordApi.WordApi(client)
-
     data = {
-        "word": word,
         "useCanonical": use_canonical,
         "relationshipTypes": "antonym",
         "limitPerRelationshipType": limit_per_relationship_type,
     }
 
-    antonyms = word_client.getRelatedWords(**data)
-    antonyms_list = antonyms[0].words
+    antonyms = await client.get_related_words(word, **data)
+    antonyms_list = antonyms[0]["words"] if antonyms else []
 
     return antonyms_list
 
 
-def get_similar_words(word, use_canonical=False, limit_per_relationship_type=10):
+@with_local_backend("get_similar_words")
+@cached_lookup("related-word")
+@coalesced(wordnik_calls)
+async def get_similar_words(word, use_canonical=False, limit_per_relationship_type=10):
     """Returns simlar words for a given word."""
-    word_client = WordApi.WordApi(client)
-
     data = {
-        "word": word,
         "useCanonical": use_canonical,
         "relationshipTypes": "related-word",
         "limitPerRelationshipType": limit_per_relationship_type,
     }
 
-    similar_words = word_client.getRelatedWords(**data)
-    similar_words_list = similar_words[0].words
+    similar_words = await client.get_related_words(word, **data)
+    similar_words_list = similar_words[0]["words"] if similar_words else []
 
     return similar_words_list
 
 
-def get_rhymes(word, use_canonical=False, limit_per_relationship_type=10):
+@cached_lookup("rhyme")
+@coalesced(wordnik_calls)
+async def get_rhymes(word, use_canonical=False, limit_per_relationship_type=10):
     """Returns rhymes for a given word."""
-    word_client = WordApi.WordApi(client)
-
     data = {
-        "word": word,
         "useCanonical": use_canonical,
         "relationshipTypes": "rhyme",
         "limitPerRelationshipType": limit_per_relationship_type,
     }
 
-    rhymes = word_client.getRelatedWords(**data)
-    rhymes_list = rhymes[0].words
+    rhymes = await client.get_related_words(word, **data)
+    rhymes_list = rhymes[0]["words"] if rhymes else []
 
     return rhymes_list
 
 
-def get_word_of_the_day():
-    """Get the word of the day with its definition."""
-    words_client = WordsApi.WordsApi(client)
+# Relationship types included in a word profile, with the lookup they populate
+PROFILE_RELATIONSHIPS = {
+    "synonym": get_synonyms,
+    "antonym": get_antonyms,
+    "related-word": get_similar_words,
+    "rhyme": get_rhymes,
+}
+
+
+async def get_related_words(
+    word, relationship_types, use_canonical=False, limit_per_relationship_type=10
+):
+    """Returns the related words of several relationship types in one request."""
+    data = {
+        "useCanonical": use_canonical,
+        "relationshipTypes": relationship_types,
+        "limitPerRelationshipType": limit_per_relationship_type,
+    }
+
+    related_words = await client.get_related_words(word, **data)
+    related_words_dict = {
+        related["relationshipType"]: related["words"] for related in related_words
+    }
+
+    return related_words_dict
+
 
-    today = datetime.today().strftime("%Y-%m-%d")
-    random_word = words_client.getWordOfTheDay(date=today)
+@with_local_backend("get_word_profile")
+@coalesced(wordnik_calls)
+async def get_word_profile(word, use_canonical=False, limit_per_relationship_type=10):
+    """Returns the definitions and all the related words of a word.
 
-    word = random_word.word
+    Relationship types already cached are reused, the missing ones are fetched
+    in a single batched request, concurrently with the definitions. Every
+    fetched type is stored in the cache of its own lookup.
+
+    When only one of the lookups succeeds (for instance when the other one
+    did not answer before the deadline), the profile is marked as partial.
+    """
+    profile = {"word": word}
+    missing_types = []
+
+    for relationship_type, lookup in PROFILE_RELATIONSHIPS.items():
+        related_words = await lookup.peek(
+            word, use_canonical, limit_per_relationship_type
+        )
+
+        if related_words is MISSING:
+            missing_types.append(relationship_type)
+        else:
+            profile[relationship_type] = related_words
+
+    async def fetch_missing_types():
+        if not missing_types:
+            return {}
+        return await get_related_words(
+            word, missing_types, use_canonical, limit_per_relationship_type
+        )
+
+    with reserve_time():
+        definitions, related_words = await asyncio.gather(
+            get_definition(word), fetch_missing_types(), return_exceptions=True
+        )
+
+    # Only fail if none of the lookups succeeded
+    if isinstance(definitions, Exception) and isinstance(related_words, Exception):
+        raise definitions
+
+    profile["partial"] = isinstance(definitions, Exception) or isinstance(
+        related_words, Exception
+    )
+    profile["definitions"] = [] if isinstance(definitions, Exception) else definitions
+
+    # Types missing from a successful response are cached as not found
+    fetched = not isinstance(related_words, Exception)
+    if not fetched:
+        related_words = {}
+
+    for relationship_type in missing_types:
+        words = related_words.get(relationship_type, [])
+        profile[relationship_type] = words
+
+        if fetched:
+            PROFILE_RELATIONSHIPS[relationship_type].prime(
+                words, word, use_canonical, limit_per_relationship_type
+            )
+
+    return profile
+
+
+@coalesced(wordnik_calls)
+async def get_word_of_the_day(date=None):
+    """Get the word of the day with its definition.
+
+    The date is an ISO formatted string and defaults to the current UTC day.
+    """
+    if date is None:
+        date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    random_word = await client.get_word_of_the_day(date=date)
+
+    word = random_word["word"]
     definitions = [
-        definition.text
-        for definition in random_word.definitions
-        if definition.text is not None
+        definition["text"]
+        for definition in random_word.get("definitions", [])
+        if definition.get("text") is not None
     ]
 
     return word, definitions
 
 
-def get_random_word():
+async def get_random_word():
     """Gets a random word (without definition)."""
-    words_client = WordsApi.WordsApi(client)
-    random_word = words_client.getRandomWord()
-    return random_word.word
+    random_word = await client.get_random_word()
+    return random_word["word"]
+
+
+async def get_random_words(limit=10, has_dictionary_def=True):
+    """Gets a list of random words (without definitions)."""
+    data = {"limit": limit, "hasDictionaryDef": has_dictionary_def}
+    random_words = await client.get_random_words(**data)
+    return [random_word["word"] for random_word in random_words]
 
 
 if __name__ == "__main__":
-    print(get_definition("ball"))
+
+    async def main():
+        print(await get_definition("ball"))
+        await client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,369 @@
+import sys
+import json
+import math
+import random
+import asyncio
+import argparse
+from os.path import dirname, abspath, join
+
+from aiohttp import web
+
+from .language_detection import language_detector
+from .resilience import TokenBucket
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+LANGUAGES_FILE = join(BASE_PROJECT_PATH, "data", "input", "langs.json")
+
+# Words answered with a 404, to exercise the "not found" paths
+NOT_FOUND_PREFIX = "zz"
+
+# Most values accepted by a single Translate API request
+MAX_TRANSLATE_VALUES = 128
+
+VOCABULARY = [
+    "anchor",
+    "breeze",
+    "candle",
+    "harbor",
+    "lantern",
+    "meadow",
+    "orchard",
+    "pebble",
+    "quill",
+    "riddle",
+    "saffron",
+    "thistle",
+    "velvet",
+    "willow",
+    "zephyr",
+]
+PARTS_OF_SPEECH = ["noun", "verb", "adjective", "adverb"]
+
+
+def parse_latency(spec):
+    """Parses a latency distribution into a function returning seconds.
+
+    Specs are "none", "constant:<seconds>", "uniform:<min>:<max>" or
+    "lognormal:<median>:<sigma>".
+    """
+    kind, *params = spec.split(":")
+    values = [float(param) for param in params]
+
+    if kind == "none":
+        return lambda: 0.0
+    if kind == "constant" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+class FaultInjector:
+    """Injects latency, errors and rate limiting into a fake upstream.
+
+    Parameters
+    ------------
+    latency: Callable[[], float]
+        Returns the delay, in seconds, added to every response.
+    error_rate: float
+        Share of the requests answered with a 503 error.
+    rate_limit: float
+        Requests per second allowed before answering with 429 errors, or
+        None for no rate limiting.
+    """
+
+    def __init__(self, *, latency, error_rate=0.0, rate_limit=None, burst=None):
+        """Initialisation for FaultInjector instance."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.bucket = (
+            TokenBucket(rate_limit, burst or max(1.0, rate_limit))
+            if rate_limit
+            else None
+        )
+
+        # Counters
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+
+    def stats(self):
+        """Returns the fault counters."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+        }
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        """Applies the faults before handling a request."""
+        if request.path == "/_stats":
+            return await handler(request)
+
+        self.requests += 1
+
+        if self.bucket is not None and not self.bucket.try_acquire():
+            self.rate_limited += 1
+            return request.app["error_response"](429, "Rate limit exceeded")
+
+        await asyncio.sleep(self.latency())
+
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return request.app["error_response"](503, "Service unavailable")
+
+        return await handler(request)
+
+
+async def get_stats(request):
+    """Returns the fault counters of the server."""
+    return web.json_response(request.app["faults"].stats())
+
+
+def create_app(faults, error_response):
+    """Creates an application with fault injection and a /_stats endpoint."""
+    app = web.Application(middlewares=[faults.middleware])
+    app["faults"] = faults
+    app["error_response"] = error_response
+    app.router.add_get("/_stats", get_stats)
+    return app
+
+
+def wordnik_error(status, message):
+    """Error response in the Wordnik format."""
+    return web.json_response({"statusCode": status, "message": message}, status=status)
+
+
+def get_limit(request, name="limit", default=10):
+    """Reads an integer query parameter."""
+    try:
+        return int(request.query.get(name, default))
+    except ValueError:
+        return default
+
+
+def word_or_404(request):
+    """Returns the requested word, raising a 404 for unknown words."""
+    word = request.match_info["word"]
+    if word.lower().startswith(NOT_FOUND_PREFIX):
+        raise web.HTTPNotFound(
+            text=json.dumps({"statusCode": 404, "message": "Not Found"}),
+            content_type="application/json",
+        )
+    return word
+
+
+async def wordnik_examples(request):
+    word = word_or_404(request)
+    skip = get_limit(request, "skip", 0)
+    limit = get_limit(request, "limit", 5)
+    examples = [
+        {"text": f"Example {index} using the word {word}."}
+        for index in range(skip + 1, skip + limit + 1)
+    ]
+    return web.json_response({"examples": examples})
+
+
+async def wordnik_definitions(request):
+    word = word_or_404(request)
+    limit = min(get_limit(request, "limit", 200), 5)
+    definitions = [
+        {
+            "text": f"Definition {index} of {word}.",
+            "partOfSpeech": PARTS_OF_SPEECH[index % len(PARTS_OF_SPEECH)],
+        }
+        for index in range(1, limit + 1)
+    ]
+    return web.json_response(definitions)
+
+
+async def wordnik_related_words(request):
+    word = word_or_404(request)
+    limit = get_limit(request, "limitPerRelationshipType", 10)
+    relationship_types = request.query.get(
+        "relationshipTypes", "synonym,antonym,related-word,rhyme"
+    ).split(",")
+    related_words = [
+        {
+            "relationshipType": relationship_type,
+            "words": [f"{word}-{relationship_type}-{index}" for index in range(limit)],
+        }
+        for relationship_type in relationship_types
+    ]
+    return web.json_response(related_words)
+
+
+async def wordnik_word_of_the_day(request):
+    date = request.query.get("date", "")
+    word = VOCABULARY[sum(map(ord, date)) % len(VOCABULARY)]
+    return web.json_response(
+        {"word": word, "definitions": [{"text": f"Definition of {word}."}]}
+    )
+
+
+async def wordnik_random_word(request):
+    return web.json_response({"word": random.choice(VOCABULARY)})
+
+
+async def wordnik_random_words(request):
+    limit = get_limit(request, "limit", 10)
+    return web.json_response(
+        [{"word": random.choice(VOCABULARY)} for _ in range(limit)]
+    )
+
+
+def create_wordnik_app(faults):
+    """Creates a fake Wordnik API, served under /v4."""
+    app = create_app(faults, wordnik_error)
+    app.router.add_get("/v4/word.json/{word}/examples", wordnik_examples)
+    app.router.add_get("/v4/word.json/{word}/definitions", wordnik_definitions)
+    app.router.add_get("/v4/word.json/{word}/relatedWords", wordnik_related_words)
+    app.router.add_get("/v4/words.json/wordOfTheDay", wordnik_word_of_the_day)
+    app.router.add_get("/v4/words.json/randomWord", wordnik_random_word)
+    app.router.add_get("/v4/words.json/randomWords", wordnik_random_words)
+    return app
+
+
+def translate_error(status, message):
+    """Error response in the Google APIs format."""
+    return web.json_response(
+        {"error": {"code": status, "message": message, "errors": []}}, status=status
+    )
+
+
+async def read_values(request):
+    """Returns the request data and its values, as a list."""
+    data = await request.json()
+    values = data.get("q", [])
+    values = [values] if isinstance(values, str) else values
+
+    if len(values) > MAX_TRANSLATE_VALUES:
+        raise web.HTTPBadRequest(
+            text=json.dumps(
+                {"error": {"code": 400, "message": "Too many text segments"}}
+            ),
+            content_type="application/json",
+        )
+    return data, values
+
+
+async def translate(request):
+    data, values = await read_values(request)
+    target = data.get("target", "en")
+    translations = [
+        {
+            "translatedText": f"[{target}] {value}",
+            "detectedSourceLanguage": language_detector.detect(value)[0] or "en",
+            "model": data.get("model") or "nmt",
+        }
+        for value in values
+    ]
+    return web.json_response({"data": {"translations": translations}})
+
+
+async def detect(request):
+    _, values = await read_values(request)
+    detections = []
+
+    for value in values:
+        language_code, confidence = language_detector.detect(value)
+        detections.append(
+            [
+                {
+                    "language": language_code or "en",
+                    "confidence": confidence,
+                    "isReliable": False,
+                }
+            ]
+        )
+
+    return web.json_response({"data": {"detections": detections}})
+
+
+async def languages(request):
+    with open(LANGUAGES_FILE, encoding="utf-8") as json_file:
+        data = json.load(json_file)
+
+    supported = [
+        {"language": language["languageCode"], "name": language["name"].strip()}
+        for language in data["languages"]
+    ]
+    return web.json_response({"data": {"languages": supported}})
+
+
+def create_translate_app(faults):
+    """Creates a fake Google Translate API (v2)."""
+    app = create_app(faults, translate_error)
+    app.router.add_post("/language/translate/v2", translate)
+    app.router.add_post("/language/translate/v2/detect", detect)
+    app.router.add_get("/language/translate/v2/languages", languages)
+    return app
+
+
+async def serve(arguments):
+    """Runs both fake upstreams until interrupted."""
+
+    def create_faults():
+        return FaultInjector(
+            latency=parse_latency(arguments.latency),
+            error_rate=arguments.error_rate,
+            rate_limit=arguments.rate_limit,
+            burst=arguments.burst,
+        )
+
+    runners = []
+    for create, port in (
+        (create_wordnik_app, arguments.wordnik_port),
+        (create_translate_app, arguments.translate_port),
+    ):
+        runner = web.AppRunner(create(create_faults()))
+        await runner.setup()
+        await web.TCPSite(runner, arguments.host, port).start()
+        runners.append(runner)
+
+    print(f"Fake Wordnik API on http://{arguments.host}:{arguments.wordnik_port}/v4")
+    print(f"Fake Translate API on http://{arguments.host}:{arguments.translate_port}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+def parse_arguments(argv):
+    """Parses the command line arguments."""
+    parser = argparse.ArgumentParser(
+        prog="python -m util.fake_upstreams",
+        description="Local stand-ins for the Wordnik and Google Translate APIs.",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--wordnik-port", type=int, default=8081)
+    parser.add_argument("--translate-port", type=int, default=8082)
+    parser.add_argument(
+        "--latency",
+        default="lognormal:0.08:0.5",
+        help="none, constant:<s>, uniform:<min>:<max> or lognormal:<median>:<sigma>",
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Share of 503 responses."
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        default=None,
+        help="Requests per second before answering with 429 responses.",
+    )
+    parser.add_argument("--burst", type=float, default=None)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_arguments(sys.argv[1:])))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,372 @@
+import os
+import re
+import sys
+import gzip
+import json
+import math
+import bisect
+from fractions import Fraction
+from os.path import dirname, abspath, join, splitext
+from collections import Counter
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+LANGUAGE_PROFILES_PATH = os.getenv("LANGUAGE_PROFILES_PATH") or join(
+    BASE_PROJECT_PATH, "data", "input", "language_profiles.json.gz"
+)
+LANGUAGES_PATH = join(BASE_PROJECT_PATH, "data", "input", "langs.json")
+LANGUAGE_SAMPLES_PATH = join(BASE_PROJECT_PATH, "data", "input", "language_samples")
+
+# Detections below this confidence are sent to the Translate API
+LANGUAGE_DETECTION_MIN_CONFIDENCE = float(
+    os.getenv("LANGUAGE_DETECTION_MIN_CONFIDENCE", "0.8")
+)
+
+NGRAM_SIZES = (1, 2, 3)
+NGRAM_MODELS = ("unigrams", "bigrams", "trigrams")
+PROFILE_SIZE = 1000
+
+# Texts shorter than this (in letters) get a proportionally lower confidence
+MIN_LETTERS = 20
+
+# Only the beginning of long texts is looked at
+MAX_CHARACTERS = 1000
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+# Unicode blocks of the scripts told apart, as sorted (start, end, script)
+SCRIPT_RANGES = sorted(
+    [
+        (0x0041, 0x024F, "Latin"),
+        (0x1E00, 0x1EFF, "Latin"),
+        (0x0370, 0x03FF, "Greek"),
+        (0x1F00, 0x1FFF, "Greek"),
+        (0x0400, 0x052F, "Cyrillic"),
+        (0x0530, 0x058F, "Armenian"),
+        (0x0590, 0x05FF, "Hebrew"),
+        (0x0600, 0x06FF, "Arabic"),
+        (0x0750, 0x077F, "Arabic"),
+        (0x08A0, 0x08FF, "Arabic"),
+        (0xFB50, 0xFDFF, "Arabic"),
+        (0xFE70, 0xFEFF, "Arabic"),
+        (0x0900, 0x097F, "Devanagari"),
+        (0x0980, 0x09FF, "Bengali"),
+        (0x0A00, 0x0A7F, "Gurmukhi"),
+        (0x0A80, 0x0AFF, "Gujarati"),
+        (0x0B00, 0x0B7F, "Oriya"),
+        (0x0B80, 0x0BFF, "Tamil"),
+        (0x0C00, 0x0C7F, "Telugu"),
+        (0x0C80, 0x0CFF, "Kannada"),
+        (0x0D00, 0x0D7F, "Malayalam"),
+        (0x0D80, 0x0DFF, "Sinhala"),
+        (0x0E00, 0x0E7F, "Thai"),
+        (0x0E80, 0x0EFF, "Lao"),
+        (0x1000, 0x109F, "Myanmar"),
+        (0x10A0, 0x10FF, "Georgian"),
+        (0x1100, 0x11FF, "Hangul"),
+        (0x3130, 0x318F, "Hangul"),
+        (0xAC00, 0xD7AF, "Hangul"),
+        (0x1200, 0x139F, "Ethiopic"),
+        (0x1780, 0x17FF, "Khmer"),
+        (0x1800, 0x18AF, "Mongolian"),
+        (0x3040, 0x30FF, "Kana"),
+        (0x3400, 0x4DBF, "Han"),
+        (0x4E00, 0x9FFF, "Han"),
+    ]
+)
+SCRIPT_STARTS = [start for start, _, _ in SCRIPT_RANGES]
+
+# Scripts used by a single supported language, detected without profiles
+SCRIPT_LANGUAGES = {
+    "Greek": "el",
+    "Armenian": "hy",
+    "Bengali": "bn",
+    "Gurmukhi": "pa",
+    "Gujarati": "gu",
+    "Oriya": "or",
+    "Tamil": "ta",
+    "Telugu": "te",
+    "Kannada": "kn",
+    "Malayalam": "ml",
+    "Sinhala": "si",
+    "Thai": "th",
+    "Lao": "lo",
+    "Myanmar": "my",
+    "Georgian": "ka",
+    "Hangul": "ko",
+    "Ethiopic": "am",
+    "Khmer": "km",
+    "Kana": "ja",
+}
+
+# Codes of the lingua models that differ from the supported language codes
+LINGUA_LANGUAGE_CODES = {"nb": "no"}
+
+# Han characters alone could be Simplified or Traditional Chinese
+HAN_LANGUAGE = "zh-cn"
+HAN_CONFIDENCE = 0.6
+
+
+def get_script(character):
+    """Returns the script of a character, or None if it is not told apart."""
+    code_point = ord(character)
+    index = bisect.bisect_right(SCRIPT_STARTS, code_point) - 1
+
+    if index >= 0:
+        start, end, script = SCRIPT_RANGES[index]
+        if code_point <= end:
+            return script
+    return None
+
+
+def dominant_script(text):
+    """Returns the most common script of a text's letters and its share.
+
+    Han characters mixed with kana are Japanese.
+    """
+    scripts = Counter(
+        get_script(character) for character in text if character.isalpha()
+    )
+    scripts.pop(None, None)
+
+    if not scripts:
+        return None, 0.0
+
+    script, count = scripts.most_common(1)[0]
+    if script == "Han" and scripts["Kana"]:
+        script, count = "Kana", count + scripts["Kana"]
+
+    return script, count / sum(scripts.values())
+
+
+def extract_ngrams(text):
+    """Yields the character n-grams of every word."""
+    for word in WORD_PATTERN.findall(text.lower()):
+        for size in NGRAM_SIZES:
+            for index in range(len(word) - size + 1):
+                yield word[index : index + size]
+
+
+def build_profile(text, size=PROFILE_SIZE):
+    """Builds the profile of a sample text.
+
+    A profile holds the log frequency of the most common n-grams, and a
+    floor used for the n-grams it does not hold.
+    """
+    counts = Counter(extract_ngrams(text))
+    total = sum(counts.values())
+    script, _ = dominant_script(text)
+
+    ngrams = {
+        ngram: round(math.log(count / total), 3)
+        for ngram, count in counts.most_common(size)
+    }
+    floor = round(min(ngrams.values()) - 1.0, 3) if ngrams else 0.0
+
+    return {"script": script, "floor": floor, "ngrams": ngrams}
+
+
+def train_profiles(samples_path=LANGUAGE_SAMPLES_PATH, size=PROFILE_SIZE):
+    """Builds a profile for every <language code>.txt file of a directory."""
+    profiles = {}
+
+    for filename in sorted(os.listdir(samples_path)):
+        language_code, extension = splitext(filename)
+        if extension != ".txt":
+            continue
+
+        with open(join(samples_path, filename), encoding="utf-8") as sample_file:
+            profile = build_profile(sample_file.read(), size)
+
+        if profile["ngrams"]:
+            profiles[language_code.lower()] = profile
+
+    return profiles
+
+
+def get_supported_language_codes(languages_path=LANGUAGES_PATH):
+    """Returns the codes of the languages the bot translates to."""
+    with open(languages_path, encoding="utf-8") as languages_file:
+        languages = json.load(languages_file)["languages"]
+    return {language["languageCode"].lower() for language in languages}
+
+
+def load_lingua_profile(language_path, size=PROFILE_SIZE):
+    """Builds a profile from the n-gram models of a lingua language.
+
+    The models hold the probability of every n-gram given its prefix, from
+    which the probability of the n-gram itself is derived.
+    """
+    import brotli
+
+    probabilities = {}
+    for model in NGRAM_MODELS:
+        model_path = join(language_path, f"{model}.json.br")
+        if not os.path.exists(model_path):
+            continue
+
+        with open(model_path, "rb") as model_file:
+            ngrams = json.loads(brotli.decompress(model_file.read()))["ngrams"]
+
+        for fraction, grouped_ngrams in ngrams.items():
+            probability = float(Fraction(fraction))
+            for ngram in grouped_ngrams.split(" "):
+                prefix = probabilities.get(ngram[:-1], 0.0) if len(ngram) > 1 else 1.0
+                probabilities[ngram] = prefix * probability
+
+    # The n-grams of every size are counted together
+    total = len(NGRAM_MODELS)
+    most_common = sorted(probabilities.items(), key=lambda item: -item[1])[:size]
+    ngrams = {
+        ngram: round(math.log(probability / total), 3)
+        for ngram, probability in most_common
+        if probability > 0
+    }
+    floor = round(min(ngrams.values()) - 1.0, 3) if ngrams else 0.0
+
+    scripts = Counter()
+    for ngram, probability in probabilities.items():
+        if len(ngram) == 1:
+            scripts[get_script(ngram)] += probability
+    scripts.pop(None, None)
+    script = scripts.most_common(1)[0][0] if scripts else None
+
+    return {"script": script, "floor": floor, "ngrams": ngrams}
+
+
+def convert_lingua_models(models_path, size=PROFILE_SIZE):
+    """Builds a profile for every supported language with a lingua model.
+
+    `models_path` is the `language-models` directory of the lingua package
+    (lingua-language-detector 1.x), whose models are trained on Wikipedia.
+    Languages recognized from their script alone are skipped.
+    """
+    supported = get_supported_language_codes()
+    profiles = {}
+
+    for lingua_code in sorted(os.listdir(models_path)):
+        language_code = LINGUA_LANGUAGE_CODES.get(lingua_code, lingua_code)
+        if language_code not in supported:
+            continue
+
+        profile = load_lingua_profile(join(models_path, lingua_code), size)
+        if profile["ngrams"] and profile["script"] not in (*SCRIPT_LANGUAGES, "Han"):
+            profiles[language_code] = profile
+
+    return profiles
+
+
+def write_profiles(profiles, output_path=LANGUAGE_PROFILES_PATH):
+    """Writes language profiles as compressed JSON."""
+    os.makedirs(dirname(abspath(output_path)), exist_ok=True)
+    temporary_path = output_path + ".tmp"
+
+    with gzip.open(temporary_path, "wt", encoding="utf-8") as profiles_file:
+        json.dump(profiles, profiles_file, ensure_ascii=False, separators=(",", ":"))
+
+    os.replace(temporary_path, output_path)
+
+
+class LanguageDetector:
+    """Offline language identification with character n-gram profiles.
+
+    Languages with a script of their own are recognized from the script
+    alone. Other texts are scored against the profiles of the languages
+    written in their script, as a naive Bayes classifier over n-grams.
+    Profiles are loaded lazily on first use; without them, only the
+    script based detection is available.
+    """
+
+    def __init__(self, path=LANGUAGE_PROFILES_PATH):
+        """Initialisation for LanguageDetector instance."""
+        self.path = path
+        self.profiles = None
+        self.scripts = {}
+
+    def load(self):
+        """Returns the profiles, loading them if needed."""
+        if self.profiles is None:
+            try:
+                with gzip.open(self.path, "rt", encoding="utf-8") as profiles_file:
+                    self.profiles = json.load(profiles_file)
+            except (OSError, ValueError):
+                self.profiles = {}
+
+            for language_code, profile in self.profiles.items():
+                self.scripts.setdefault(profile["script"], []).append(language_code)
+
+        return self.profiles
+
+    def score(self, ngrams, language_codes):
+        """Returns the probability of each language given the n-grams."""
+        profiles = self.load()
+        scores = {}
+
+        for language_code in language_codes:
+            profile = profiles[language_code]
+            frequencies, floor = profile["ngrams"], profile["floor"]
+            scores[language_code] = sum(
+                frequencies.get(ngram, floor) * count for ngram, count in ngrams.items()
+            )
+
+        best = max(scores.values())
+        weights = {code: math.exp(score - best) for code, score in scores.items()}
+        total = sum(weights.values())
+        return {code: weight / total for code, weight in weights.items()}
+
+    def detect(self, text):
+        """Returns the language code of a text and a confidence from 0 to 1.
+
+        Returns (None, 0.0) when the language cannot be told locally.
+        """
+        text = text[:MAX_CHARACTERS]
+        script, share = dominant_script(text)
+        if script is None:
+            return None, 0.0
+
+        letters = sum(1 for character in text if character.isalpha())
+        length_factor = min(1.0, letters / MIN_LETTERS)
+
+        self.load()
+        language_codes = self.scripts.get(script, [])
+
+        if language_codes:
+            ngrams = Counter(extract_ngrams(text))
+            probabilities = self.score(ngrams, language_codes)
+            language_code = max(probabilities, key=probabilities.get)
+            confidence = probabilities[language_code] * share * length_factor
+            return language_code, confidence
+
+        if script in SCRIPT_LANGUAGES:
+            return SCRIPT_LANGUAGES[script], share
+
+        if script == "Han":
+            return HAN_LANGUAGE, HAN_CONFIDENCE * share
+
+        return None, 0.0
+
+
+# Process-wide language detector
+language_detector = LanguageDetector()
+
+
+if __name__ == "__main__":
+    # Usage: python -m util.language_detection [--lingua] <input directory> [output path]
+    arguments = sys.argv[1:]
+    from_lingua = bool(arguments) and arguments[0] == "--lingua"
+    if from_lingua:
+        arguments = arguments[1:]
+
+    if not arguments:
+        print(
+            "Usage: python -m util.language_detection "
+            "[--lingua] <samples_path|lingua_models_path> [output_path]"
+        )
+        sys.exit(1)
+
+    output = arguments[1] if len(arguments) > 1 else LANGUAGE_PROFILES_PATH
+    if from_lingua:
+        trained = convert_lingua_models(arguments[0])
+    else:
+        trained = train_profiles(arguments[0])
+    write_profiles(trained, output)
+    print(f"Wrote {len(trained)} language profiles to {output}")
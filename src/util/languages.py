@@ -0,0 +1,114 @@
+import json
+from os.path import dirname, abspath, join
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+LANGUAGES_FILE = join(BASE_PROJECT_PATH, "data", "input", "langs.json")
+
+# Placeholders used in the data file for languages without a country flag
+MISSING_FLAGS = ("", "n/a")
+
+
+class Language:
+    """Language class that represents a language used for translation."""
+
+    __slots__ = ("language_name", "native_name", "language_code", "country_flags")
+
+    def __init__(self, language_name, language_code, country_flag, native_name=""):
+        """Initialisation for Language instance."""
+        self.language_name = language_name.strip().lower()
+        self.native_name = native_name.strip().lower()
+        self.language_code = language_code.strip().lower()
+        self.country_flags = country_flag.strip().lower()
+
+    def __str__(self):
+        """String representation of the object."""
+        return f"Language: {self.language_name}, Code: {self.language_code}, Flags: {self.country_flags}"
+
+    def __repr__(self):
+        """Object representation."""
+        return f"Language: {self.language_name}, Code: {self.language_code}, Flags: {self.country_flags}"
+
+    def __key(self):
+        """Base key for equality and hash methods."""
+        return (self.language_name, self.language_code, self.country_flags)
+
+    def __eq__(self, other):
+        """Check if a two languages are the same."""
+        if not isinstance(other, Language):
+            return NotImplemented
+        return self.__key() == other.__key()
+
+    def __hash__(self):
+        """Returns the hash value of an instance."""
+        return hash(self.__key())
+
+    @property
+    def flags(self):
+        """Returns the individual country flags of the language."""
+        flags = (flag.strip() for flag in self.country_flags.split(","))
+        return tuple(flag for flag in flags if flag not in MISSING_FLAGS)
+
+
+class LanguageIndex:
+    """Read-only index of the supported languages.
+
+    Language codes, names, native names and individual country flags all
+    map to a shared Language instance, so a lookup is a single dictionary
+    access. Codes take precedence over names, names over native names and
+    native names over flags. A flag used by several languages maps to the
+    first one listed in the data file.
+    """
+
+    __slots__ = ("languages", "lookup")
+
+    def __init__(self, languages):
+        """Initialisation for LanguageIndex instance."""
+        self.languages = tuple(languages)
+        self.lookup = {}
+
+        for keys in (
+            lambda language: (language.language_code,),
+            lambda language: (language.language_name,),
+            lambda language: (language.native_name,),
+            lambda language: language.flags,
+        ):
+            for language in self.languages:
+                for key in keys(language):
+                    if key:
+                        self.lookup.setdefault(key, language)
+
+    def __len__(self):
+        return len(self.languages)
+
+    def __iter__(self):
+        return iter(self.languages)
+
+    def __contains__(self, language):
+        return isinstance(language, Language) and (
+            self.lookup.get(language.language_code) == language
+        )
+
+    def get(self, text):
+        """Returns the language matching a code, name or flag, or None."""
+        if not text:
+            return None
+        return self.lookup.get(text.strip().lower())
+
+
+def build_language_index(data):
+    """Builds a language index from the contents of the languages file."""
+    return LanguageIndex(
+        Language(
+            language["name"],
+            language["languageCode"],
+            language["countryFlag"],
+            language.get("nativeName", ""),
+        )
+        for language in data["languages"]
+    )
+
+
+def load_language_index(path=LANGUAGES_FILE):
+    """Loads the language index of a languages file."""
+    with open(path, encoding="utf-8") as json_file:
+        return build_language_index(json.load(json_file))
@@ -0,0 +1,364 @@
+import os
+import re
+import sys
+import mmap
+import json
+import struct
+from os.path import dirname, abspath, join, exists
+from collections import defaultdict
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+LEXICON_PATH = os.getenv("DICTIONARY_LEXICON_PATH") or join(
+    BASE_PROJECT_PATH, "data", "lexicon", "lexicon.kblex"
+)
+
+# Lexicon file layout (little-endian):
+#   magic (8 bytes) | entry count (uint32) | record offsets (uint32 * count)
+#   records sorted by headword: headword length (uint16) | headword |
+#   payload length (uint32) | JSON payload
+MAGIC = b"KBLEX\x00\x01\x00"
+HEADER = struct.Struct("<8sI")
+OFFSET = struct.Struct("<I")
+HEADWORD_LENGTH = struct.Struct("<H")
+PAYLOAD_LENGTH = struct.Struct("<I")
+
+# WordNet data files with the pointer key and part of speech of their synsets
+WORDNET_FILES = {
+    "data.noun": ("n", "noun"),
+    "data.verb": ("v", "verb"),
+    "data.adj": ("a", "adjective"),
+    "data.adv": ("r", "adverb"),
+}
+
+# WordNet pointer symbols for each relationship type
+ANTONYM_POINTERS = ("!",)
+SIMILAR_POINTERS = ("&", "^", "@")
+
+ADJECTIVE_MARKER = re.compile(r"\([a-z]+\)$")
+
+
+class LexiconError(Exception):
+    """Raised when a lexicon file is missing or invalid."""
+
+
+class Lexicon:
+    """Read-only, memory-mapped headword index.
+
+    Headwords are stored sorted, so a lookup is a binary search over the
+    record offsets, O(log n), without loading the file into memory.
+    """
+
+    def __init__(self, path):
+        """Initialisation for Lexicon instance."""
+        self.path = path
+
+        with open(path, "rb") as lexicon_file:
+            self.mmap = mmap.mmap(lexicon_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count = HEADER.unpack_from(self.mmap, 0)
+        if magic != MAGIC:
+            self.mmap.close()
+            raise LexiconError(f"{path} is not a lexicon file")
+
+        self.offsets_start = HEADER.size
+        self.records_start = self.offsets_start + self.count * OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, headword):
+        return self.find(headword) is not None
+
+    def record_offset(self, index):
+        """Returns the absolute offset of the record at an index."""
+        position = self.offsets_start + index * OFFSET.size
+        return self.records_start + OFFSET.unpack_from(self.mmap, position)[0]
+
+    def headword_at(self, offset):
+        """Returns the encoded headword of the record at an offset."""
+        (length,) = HEADWORD_LENGTH.unpack_from(self.mmap, offset)
+        start = offset + HEADWORD_LENGTH.size
+        return self.mmap[start : start + length]
+
+    def find(self, headword):
+        """Returns the offset of a headword record, or None if it is missing."""
+        key = headword.strip().lower().encode("utf-8")
+        low, high = 0, self.count - 1
+
+        while low <= high:
+            middle = (low + high) // 2
+            offset = self.record_offset(middle)
+            current = self.headword_at(offset)
+
+            if current == key:
+                return offset
+            if current < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+
+        return None
+
+    def get(self, headword):
+        """Returns the entry of a headword, or None if it is missing."""
+        offset = self.find(headword)
+        if offset is None:
+            return None
+
+        (headword_length,) = HEADWORD_LENGTH.unpack_from(self.mmap, offset)
+        position = offset + HEADWORD_LENGTH.size + headword_length
+        (payload_length,) = PAYLOAD_LENGTH.unpack_from(self.mmap, position)
+        start = position + PAYLOAD_LENGTH.size
+
+        return json.loads(self.mmap[start : start + payload_length])
+
+    def headwords(self):
+        """Yields every headword of the lexicon in order."""
+        for index in range(self.count):
+            yield self.headword_at(self.record_offset(index)).decode("utf-8")
+
+    def close(self):
+        """Unmaps the lexicon file."""
+        self.mmap.close()
+
+
+def write_lexicon(entries, output_path):
+    """Writes a dictionary of {headword: entry} as a lexicon file."""
+    os.makedirs(dirname(abspath(output_path)), exist_ok=True)
+
+    encoded = sorted(
+        (headword.lower().encode("utf-8"), entry) for headword, entry in entries.items()
+    )
+
+    records = bytearray()
+    offsets = []
+
+    for headword, entry in encoded:
+        payload = json.dumps(entry, separators=(",", ":")).encode("utf-8")
+        offsets.append(len(records))
+        records += HEADWORD_LENGTH.pack(len(headword)) + headword
+        records += PAYLOAD_LENGTH.pack(len(payload)) + payload
+
+    temporary_path = output_path + ".tmp"
+
+    with open(temporary_path, "wb") as lexicon_file:
+        lexicon_file.write(HEADER.pack(MAGIC, len(offsets)))
+        for offset in offsets:
+            lexicon_file.write(OFFSET.pack(offset))
+        lexicon_file.write(records)
+
+    os.replace(temporary_path, output_path)
+
+
+def parse_wordnet_line(line):
+    """Parses a synset line of a WordNet data file."""
+    data, _, gloss = line.partition(" | ")
+    fields = data.split()
+
+    offset = fields[0]
+    word_count = int(fields[3], 16)
+    words = []
+
+    for index in range(word_count):
+        word = fields[4 + index * 2]
+        word = ADJECTIVE_MARKER.sub("", word).replace("_", " ")
+        words.append(word)
+
+    position = 4 + word_count * 2
+    pointer_count = int(fields[position])
+    pointers = []
+
+    for index in range(pointer_count):
+        start = position + 1 + index * 4
+        symbol, target_offset, target_pos, source_target = fields[start : start + 4]
+        pointers.append(
+            (
+                symbol,
+                target_offset,
+                target_pos,
+                int(source_target[:2], 16),
+                int(source_target[2:], 16),
+            )
+        )
+
+    # The gloss holds the definition followed by quoted examples
+    definition = gloss.strip().split('; "')[0].strip()
+
+    return offset, words, pointers, definition
+
+
+def read_wordnet(wordnet_path):
+    """Reads the synsets of a WordNet database directory."""
+    synsets = {}
+
+    for filename, (pos_key, part_of_speech) in WORDNET_FILES.items():
+        file_path = join(wordnet_path, filename)
+        if not exists(file_path):
+            continue
+
+        with open(file_path, encoding="utf-8") as data_file:
+            for line in data_file:
+                # License lines start with spaces
+                if line.startswith(" "):
+                    continue
+
+                offset, words, pointers, definition = parse_wordnet_line(line)
+                synsets[(pos_key, offset)] = (
+                    part_of_speech,
+                    words,
+                    pointers,
+                    definition,
+                )
+
+    return synsets
+
+
+def build_lexicon(wordnet_path, output_path=LEXICON_PATH):
+    """Imports a WordNet database directory into a lexicon file.
+
+    Returns the number of headwords written.
+    """
+    synsets = read_wordnet(wordnet_path)
+    if not synsets:
+        raise LexiconError(f"No WordNet data files found in {wordnet_path}")
+
+    entries = defaultdict(
+        lambda: {"definitions": [], "synonym": [], "antonym": [], "related-word": []}
+    )
+
+    def add_unique(words, word):
+        if word not in words:
+            words.append(word)
+
+    for part_of_speech, words, pointers, definition in synsets.values():
+        for word_index, word in enumerate(words, 1):
+            entry = entries[word.lower()]
+            entry["definitions"].append(
+                {"partOfSpeech": part_of_speech, "text": definition}
+            )
+
+            for synonym in words:
+                if synonym.lower() != word.lower():
+                    add_unique(entry["synonym"], synonym)
+
+            for symbol, target_offset, target_pos, source, target in pointers:
+                # Satellite adjectives share the adjective file
+                target_synset = synsets.get(
+                    ("a" if target_pos == "s" else target_pos, target_offset)
+                )
+                if target_synset is None:
+                    continue
+
+                target_words = target_synset[1]
+
+                # Lexical pointers only apply to a single word of the synset
+                if source and source != word_index:
+                    continue
+                target_word = target_words[target - 1] if target else target_words[0]
+
+                if symbol in ANTONYM_POINTERS:
+                    add_unique(entry["antonym"], target_word)
+                elif symbol in SIMILAR_POINTERS:
+                    add_unique(entry["related-word"], target_word)
+
+    write_lexicon(entries, output_path)
+    return len(entries)
+
+
+class LocalDictionary:
+    """Offline dictionary backend with the same interface as util.dictionary.
+
+    Lookups return None when the lexicon has no data for a word, so callers
+    can fall back to Wordnik. The lexicon is opened lazily on first use.
+    """
+
+    def __init__(self, path=LEXICON_PATH):
+        """Initialisation for LocalDictionary instance."""
+        self.path = path
+        self.lexicon = None
+        self.unavailable = False
+
+    @property
+    def is_available(self):
+        """Whether a lexicon file could be opened."""
+        return self.open() is not None
+
+    def open(self):
+        """Returns the lexicon, opening it if needed."""
+        if self.lexicon is None and not self.unavailable:
+            try:
+                self.lexicon = Lexicon(self.path)
+            except (OSError, ValueError, struct.error, LexiconError):
+                self.unavailable = True
+
+        return self.lexicon
+
+    def lookup(self, word):
+        """Returns the lexicon entry of a word, or None."""
+        lexicon = self.open()
+        return lexicon.get(word) if lexicon is not None else None
+
+    def get_definition(self, word, limit=200, part_of_speech=None, **kwargs):
+        """Returns word definitions."""
+        entry = self.lookup(word)
+        if entry is None:
+            return None
+
+        definitions = [
+            definition["text"]
+            for definition in entry["definitions"]
+            if part_of_speech is None or definition["partOfSpeech"] == part_of_speech
+        ]
+        return definitions[:limit] or None
+
+    def get_related_words(self, word, relationship_type, limit):
+        """Returns the words of a relationship type."""
+        entry = self.lookup(word)
+        if entry is None:
+            return None
+        return entry.get(relationship_type, [])[:limit] or None
+
+    def get_synonyms(self, word, limit_per_relationship_type=10, **kwargs):
+        """Returns word synonyms."""
+        return self.get_related_words(word, "synonym", limit_per_relationship_type)
+
+    def get_antonyms(self, word, limit_per_relationship_type=10, **kwargs):
+        """Returns word antonyms."""
+        return self.get_related_words(word, "antonym", limit_per_relationship_type)
+
+    def get_similar_words(self, word, limit_per_relationship_type=10, **kwargs):
+        """Returns similar words for a given word."""
+        return self.get_related_words(word, "related-word", limit_per_relationship_type)
+
+    def get_word_profile(self, word, limit_per_relationship_type=10, **kwargs):
+        """Returns the definitions and all the related words of a word."""
+        entry = self.lookup(word)
+        if entry is None:
+            return None
+
+        profile = {
+            "word": word,
+            "definitions": [definition["text"] for definition in entry["definitions"]],
+            "rhyme": [],
+        }
+        for relationship_type in ("synonym", "antonym", "related-word"):
+            profile[relationship_type] = entry[relationship_type][
+                :limit_per_relationship_type
+            ]
+
+        return profile
+
+
+# Process-wide local dictionary
+local_dictionary = LocalDictionary()
+
+
+if __name__ == "__main__":
+    # Usage: python -m util.lexicon <wordnet dict directory> [output path]
+    if len(sys.argv) < 2:
+        print("Usage: python -m util.lexicon <wordnet_dict_path> [output_path]")
+        sys.exit(1)
+
+    output = sys.argv[2] if len(sys.argv) > 2 else LEXICON_PATH
+    count = build_lexicon(sys.argv[1], output)
+    print(f"Wrote {count} headwords to {output}")
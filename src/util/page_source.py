@@ -0,0 +1,95 @@
+import asyncio
+
+from .cache import MISSING, LRUCache
+from .deadlines import set_deadline
+
+
+class PageSource:
+    """Fetches the entries of a paginator's pages on demand.
+
+    Pages are fetched with `fetch(skip, limit)`, which returns a list of
+    entries. One more entry than fits in a page is asked for, to know
+    whether another page follows, so the number of pages is only known once
+    the last one was fetched. Fetched pages are cached, and concurrent
+    requests for a page share a single fetch.
+
+    Parameters
+    ------------
+    fetch: Callable[[int, int], Awaitable[List]]
+        Coroutine function returning `limit` entries after the first `skip`.
+    per_page: int
+        How many entries show up per page.
+    max_entries: int
+        Entries after this many are never fetched, or None.
+    cache_size: int
+        How many fetched pages are kept.
+    """
+
+    def __init__(self, fetch, *, per_page, max_entries=None, cache_size=32):
+        """Initialisation for PageSource instance."""
+        self.fetch = fetch
+        self.per_page = per_page
+        self.max_entries = max_entries
+        self.pages = LRUCache(cache_size)
+        self.tasks = {}
+
+        # Known once the last page was fetched
+        self.maximum_pages = None
+        self.last_known_page = 0
+
+    @property
+    def known_pages(self):
+        """Pages known to exist, which are all the pages once the last was fetched."""
+        if self.maximum_pages is not None:
+            return self.maximum_pages
+        return self.last_known_page
+
+    async def load(self, page):
+        """Fetches the entries of a page."""
+        # Every page gets the latency budget of a command of its own
+        set_deadline()
+
+        skip = (page - 1) * self.per_page
+        limit = self.per_page + 1
+        if self.max_entries is not None:
+            limit = min(limit, self.max_entries - skip)
+
+        entries = await self.fetch(skip, limit) if limit > 0 else []
+        has_more = len(entries) > self.per_page
+        entries = entries[: self.per_page]
+
+        if has_more:
+            self.last_known_page = max(self.last_known_page, page + 1)
+        elif entries or page == 1:
+            self.maximum_pages = page
+        else:
+            self.maximum_pages = min(self.maximum_pages or page, page - 1)
+
+        self.pages.set(page, entries)
+        return entries
+
+    def start(self, page):
+        """Starts fetching a page, unless it is fetched already."""
+        task = self.tasks.get(page)
+        if task is None:
+            task = asyncio.ensure_future(self.load(page))
+            task.add_done_callback(lambda _: self.tasks.pop(page, None))
+            self.tasks[page] = task
+        return task
+
+    async def get_page(self, page):
+        """Returns the entries of a page, fetching them if needed."""
+        entries = self.pages.get(page)
+        if entries is not MISSING:
+            return entries
+        return await asyncio.shield(self.start(page))
+
+    def prefetch(self, page):
+        """Fetches a page in the background, if it may exist and is not cached."""
+        if page < 1 or (self.maximum_pages is not None and page > self.maximum_pages):
+            return
+        if self.pages.get(page) is MISSING:
+            # Failed pages are fetched again when they are actually shown
+            self.start(page).add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
@@ -1,12 +1,36 @@
 import asyncio
+import functools
+import textwrap
 import discord
 from discord.ext.commands import Paginator as CommandPaginator
 
+from .cache import MISSING, LRUCache
+from .logger import generate_logger
+from .reactions import reaction_pipeline
+from .sessions import paginator_sessions
+
+# Rendered pages kept by every paginator
+RENDERED_PAGES = 32
+
+# Pages rendered or reused, and message edits sent or skipped, by every paginator
+page_counters = {"rendered": 0, "memoized": 0, "edited": 0, "unchanged": 0}
+
+logger = generate_logger(__name__)
+
 
 class CannotPaginate(Exception):
     pass
 
 
+def get_paginator_stats():
+    """Returns the counters of the paginator sessions and their reactions."""
+    return {
+        **paginator_sessions.stats(),
+        "reactions": reaction_pipeline.stats(),
+        "pages": dict(page_counters),
+    }
+
+
 class Pages:
     """Implements a paginator that queries the user for the
     pagination interface.
@@ -23,6 +47,9 @@ class Pages:
         How many entries show up per page.
     show_entry_count: bool
         Whether to show an entry count in the footer.
+    source: PageSource
+        Fetches the entries of every page when it is shown, instead of
+        `entries`. The following page is prefetched in the background.
     Attributes
     -----------
     embed: discord.Embed
@@ -33,10 +60,13 @@ class Pages:
         Our permissions for the channel.
     """
 
-    def __init__(self, ctx, *, entries, per_page=12, show_entry_count=True):
+    def __init__(
+        self, ctx, *, entries=None, per_page=12, show_entry_count=True, source=None
+    ):
         """Initialisation for Page class instances."""
         self.bot = ctx.bot
-        self.entries = entries
+        self.entries = entries if entries is not None else []
+        self.source = source
         self.message = ctx.message
         self.channel = ctx.channel
         self.author = ctx.author
@@ -51,10 +81,22 @@ class Pages:
 
         # Check if
         self.maximum_pages = pages
+        self.reactions = asyncio.Queue()
+        self.session = None
+        self.controls = set()
+        self.started_at = None
+        self.rendered = LRUCache(RENDERED_PAGES)
+        self.displayed = None
         self.embed = discord.Embed(color=discord.Color.dark_purple())
-        self.paginating = len(entries) > per_page
+        self.paginating = len(self.entries) > per_page
         self.show_entry_count = show_entry_count
 
+        # Pages fetched on demand are counted as they are discovered
+        if source is not None:
+            self.maximum_pages = max(source.known_pages, 1)
+            self.paginating = True
+            self.show_entry_count = False
+
         # Reaction map for the navigation
         self.reaction_emojis = [
             (
@@ -77,6 +119,25 @@ class Pages:
         base = (page - 1) * self.per_page
         return self.entries[base : base + self.per_page]
 
+    async def load_page(self, page):
+        """Gets the entries of a page, fetching them from the page source if any."""
+        if self.source is None:
+            return self.get_page(page)
+
+        entries = await self.source.get_page(page)
+        self.maximum_pages = max(self.source.known_pages, 1)
+        self.source.prefetch(page + 1)
+
+        if self.session is not None:
+            self.add_controls()
+        return entries
+
+    def format_page_count(self):
+        """Returns the number of pages, followed by a + while more may follow."""
+        if self.source is not None and self.source.maximum_pages is None:
+            return f"{self.maximum_pages}+"
+        return f"{self.maximum_pages}"
+
     def get_content(self, entries, page, *, first=False):
         """Gets the content from a page."""
         return None
@@ -86,6 +147,50 @@ class Pages:
         self.prepare_embed(entries, page, first=first)
         return self.embed
 
+    def render_key(self, page, first):
+        """Returns what the rendering of a page depends on, besides its entries."""
+        return (page, first, self.format_page_count())
+
+    def render_page(self, entries, page, *, first=False):
+        """Returns the content and embed of a page, rendering them once.
+
+        The content and embed dict shown are returned as well, to compare
+        them with the ones displayed.
+        """
+        key = self.render_key(page, first)
+        rendered = self.rendered.get(key)
+        if rendered is not MISSING:
+            page_counters["memoized"] += 1
+            return rendered
+
+        content = self.get_content(entries, page, first=first)
+        embed = self.get_embed(entries, page, first=first)
+
+        # The embed is reused for every page, so a copy is kept
+        if embed is not None:
+            embed = embed.copy()
+
+        shown = (content, embed.to_dict() if embed is not None else None)
+        rendered = (content, embed, shown)
+        self.rendered.set(key, rendered)
+        page_counters["rendered"] += 1
+        return rendered
+
+    async def display(self, content, embed, *, shown=None):
+        """Edits the message, unless it shows the same content and embed already."""
+        if shown is None:
+            shown = (content, embed.to_dict() if embed is not None else None)
+
+        if shown == self.displayed:
+            page_counters["unchanged"] += 1
+            return
+
+        # What is displayed is unknown until the edit succeeds
+        self.displayed = None
+        await self.message.edit(content=content, embed=embed)
+        self.displayed = shown
+        page_counters["edited"] += 1
+
     def prepare_embed(self, entries, page, *, first=False):
         """Prepares embed for a page."""
         p = []
@@ -98,7 +203,7 @@ class Pages:
             if self.show_entry_count:
                 text = f"Page {page}/{self.maximum_pages} ({len(self.entries)} entries)"
             else:
-                text = f"Page {page}/{self.maximum_pages}"
+                text = f"Page {page}/{self.format_page_count()}"
 
             self.embed.set_footer(text=text)
 
@@ -110,10 +215,20 @@ class Pages:
 
     async def show_page(self, page, *, first=False):
         """Shows the specified page with its entries."""
+        try:
+            entries = await self.load_page(page)
+        except Exception as e:
+            if first:
+                raise
+            # Keep showing the current page
+            logger.error(f"Could not load page {page}: {e}")
+            return
+
+        if first and self.source is not None:
+            self.paginating = self.maximum_pages > 1
+
         self.current_page = page
-        entries = self.get_page(page)
-        content = self.get_content(entries, page, first=first)
-        embed = self.get_embed(entries, page, first=first)
+        content, embed, shown = self.render_page(entries, page, first=first)
 
         # Check if there is pagination
         if not self.paginating:
@@ -121,18 +236,50 @@ class Pages:
 
         # If message is not the first message sent, edit it with the new content and embed
         if not first:
-            await self.message.edit(content=content, embed=embed)
+            await self.display(content, embed, shown=shown)
             return
 
         self.message = await self.channel.send(content=content, embed=embed)
 
-        for (reaction, _) in self.reaction_emojis:
-            if self.maximum_pages == 2 and reaction in ("\u23ed", "\u23ee"):
-                # Remove |<< and >>| if there are only two pages for the embed
-                # Users can still use it, but in this case, it won't have any effect
-                continue
+        # The hint of the first message alone is not worth an edit
+        self.displayed = self.render_page(entries, page)[2]
 
-            await self.message.add_reaction(reaction)
+        # Reactions to the message are routed to this session, which can be
+        # navigated right away, while its controls are added in the background
+        self.session = paginator_sessions.register(
+            self, self.message.id, self.author.id, self.started_at
+        )
+        self.add_controls()
+
+    def navigation_emojis(self):
+        """Returns the reactions that make sense for the number of pages."""
+        skipped = []
+
+        # Users can still use the others, but they won't have any effect
+        if self.maximum_pages < 2:
+            skipped += [self.previous_page, self.next_page]
+        if self.maximum_pages < 3:
+            skipped += [self.first_page, self.last_page]
+        if self.maximum_pages < 6:
+            skipped.append(self.numbered_page)
+
+        return [emoji for (emoji, func) in self.reaction_emojis if func not in skipped]
+
+    def add_controls(self):
+        """Adds the navigation reactions that are still missing, in the background."""
+        emojis = [
+            emoji for emoji in self.navigation_emojis() if emoji not in self.controls
+        ]
+        if not emojis:
+            return
+
+        self.controls.update(emojis)
+        reaction_pipeline.add(
+            self.message,
+            emojis,
+            is_wanted=lambda: self.paginating,
+            on_done=functools.partial(paginator_sessions.controls_added, self.session),
+        )
 
     async def checked_show_page(self, page):
         """Checks that the given page not exceed
@@ -225,14 +372,19 @@ class Pages:
         )
 
         # Edit the same message with the new embed
-        await self.message.edit(content=None, embed=embed)
-
-        async def go_back_to_current_page():
-            await asyncio.sleep(60.0)
-            await self.show_current_page()
+        await self.display(None, embed)
 
         # Go back to the page before this help message
-        self.bot.loop.create_task(go_back_to_current_page())
+        self.schedule_restore(60.0)
+
+    def schedule_restore(self, delay):
+        """Shows the current page again after a delay, in seconds."""
+        if self.session is not None:
+            paginator_sessions.schedule_restore(
+                self.session,
+                delay,
+                lambda: self.bot.loop.create_task(self.show_current_page()),
+            )
 
     async def stop_pages(self):
         """Stops the interactive pagination session."""
@@ -258,26 +410,41 @@ class Pages:
 
         return False
 
+    def on_reaction(self, payload):
+        """Queues a reaction to the message, if it is a navigation reaction."""
+        if self.react_check(payload):
+            paginator_sessions.touch(self.session)
+            self.reactions.put_nowait((payload, self.match))
+
+    def expire(self):
+        """Ends the pagination session, once it is idle or evicted."""
+        self.reactions.put_nowait(None)
+
     async def paginate(self):
         """Actually paginate the entries and run the interactive loop if necessary."""
-        first_page = self.show_page(1, first=True)
+        self.started_at = asyncio.get_event_loop().time()
 
-        if not self.paginating:
-            await first_page
-        else:
-            # Allow us to react to reactions right away if we're paginating
-            self.bot.loop.create_task(first_page)
+        # Reactions can be used as soon as the first page is sent,
+        # the controls are added in the background
+        paginator_sessions.attach(self.bot)
+        await self.show_page(1, first=True)
 
+        try:
+            await self.handle_reactions()
+        finally:
+            if self.session is not None:
+                paginator_sessions.unregister(self.session)
+
+    async def handle_reactions(self):
+        """Runs the actions of the reactions routed to this session."""
         # While embed is being paginated
         while self.paginating:
-            try:
-                # Wait for a reaction to be added by the original user.
-                # The waiting time limit is 2 minutes
-                payload = await self.bot.wait_for(
-                    "raw_reaction_add", check=self.react_check, timeout=120.0
-                )
-            except asyncio.TimeoutError:
-                # After the 2 minutes, stop the pagination, and
+            # Wait for a reaction to be added by the original user.
+            # Sessions idle for 2 minutes are expired by the session manager
+            reaction = await self.reactions.get()
+
+            if reaction is None:
+                # Once expired, stop the pagination, and
                 # clear all the reactions from the message
                 self.paginating = False
                 try:
@@ -287,6 +454,8 @@ class Pages:
                 finally:
                     break
 
+            payload, match = reaction
+
             try:
                 # After the original user has reacted to the embed, try to remove it
                 # in order to keep the count in 1 for every emoji
@@ -296,7 +465,7 @@ class Pages:
             except:
                 pass  # can't remove it so don't bother doing so
 
-            await self.match()
+            await match()
 
 
 class FieldPages(Pages):
@@ -316,25 +485,76 @@ class FieldPages(Pages):
             if self.show_entry_count:
                 text = f"Page {page}/{self.maximum_pages} ({len(self.entries)} entries)"
             else:
-                text = f"Page {page}/{self.maximum_pages}"
+                text = f"Page {page}/{self.format_page_count()}"
 
             self.embed.set_footer(text=text)
 
 
 class TextPages(Pages):
-    """Uses a commands.Paginator internally to paginate some text."""
+    """Uses a commands.Paginator internally to paginate some text.
+
+    With `complete=False`, more text is expected to be added with `add_text`
+    while the pages are shown, and the pages are paginated from the start.
+    """
 
-    def __init__(self, ctx, text, *, prefix="```", suffix="```", max_size=2000):
-        paginator = CommandPaginator(
+    def __init__(
+        self, ctx, text, *, prefix="```", suffix="```", max_size=2000, complete=True
+    ):
+        self.paginator = CommandPaginator(
             prefix=prefix, suffix=suffix, max_size=max_size - 200
         )
-        for line in text.split("\n"):
-            paginator.add_line(line)
+        self.command_message = ctx.message
+        self.complete = complete
+        self.add_lines(text)
 
         super().__init__(
-            ctx, entries=paginator.pages, per_page=1, show_entry_count=False
+            ctx, entries=self.paginator.pages, per_page=1, show_entry_count=False
+        )
+        self.paginating = self.paginating or not complete
+
+    def add_lines(self, text):
+        """Adds text to the paginator, wrapping lines too long for a page."""
+        max_line_size = (
+            self.paginator.max_size
+            - len(self.paginator.prefix or "")
+            - len(self.paginator.suffix or "")
+            - 2
         )
 
+        for line in text.split("\n"):
+            if len(line) > max_line_size:
+                for wrapped_line in textwrap.wrap(line, max_line_size):
+                    self.paginator.add_line(wrapped_line)
+            else:
+                self.paginator.add_line(line)
+
+    async def add_text(self, text, *, complete=False):
+        """Adds text on new pages, and refreshes the page currently shown."""
+        if text:
+            self.add_lines(text)
+        self.entries = self.paginator.pages
+        self.maximum_pages = len(self.entries)
+        self.complete = complete
+
+        # The last page may have grown
+        self.rendered.clear()
+        if self.session is not None:
+            self.add_controls()
+        await self.refresh()
+
+    async def refresh(self):
+        """Shows the current page again, to update the page count."""
+        if self.message is self.command_message or not self.paginating:
+            return
+
+        try:
+            await self.show_page(self.current_page)
+        except discord.HTTPException:
+            pass
+
+    def render_key(self, page, first):
+        return (*super().render_key(page, first), self.complete)
+
     def get_page(self, page):
         return self.entries[page - 1]
 
@@ -342,6 +562,8 @@ class TextPages(Pages):
         return None
 
     def get_content(self, entry, page, *, first=False):
+        if not self.complete:
+            return f"{entry}\nPage {page}/{self.maximum_pages} (more to come...)"
         if self.maximum_pages > 1:
             return f"{entry}\nPage {page}/{self.maximum_pages}"
         return entry
@@ -0,0 +1,140 @@
+import asyncio
+from collections import deque
+
+from .dictionary import get_definition, get_random_words
+from .logger import generate_logger
+from .wordnik import WORDNIK_RATE_BURST, client
+
+logger = generate_logger(__name__)
+
+
+class RandomWordPool:
+    """Ring buffer of random words with their definitions, ready to be served.
+
+    Words are taken from the front of the buffer. Whenever the number of
+    words left drops below the low-water mark, a background task fetches a
+    new batch of random words and their definitions, off the command hot
+    path. The refill has a lower priority than user commands: it makes a
+    few requests at a time, and only while enough of the Wordnik quota is
+    left for the commands.
+
+    Parameters
+    ------------
+    capacity: int
+        Maximum number of words kept in the pool.
+    low_water_mark: int
+        Number of words below which the pool is refilled.
+    batch_size: int
+        Number of random words requested per upstream call.
+    concurrency: int
+        Maximum number of upstream requests made at the same time.
+    reserved_tokens: int
+        Number of rate limiter tokens kept for user commands.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity=50,
+        low_water_mark=15,
+        batch_size=25,
+        retry_delay=30.0,
+        concurrency=3,
+        reserved_tokens=WORDNIK_RATE_BURST // 2,
+    ):
+        """Initialisation for RandomWordPool instance."""
+        self.entries = deque(maxlen=capacity)
+        self.capacity = capacity
+        self.low_water_mark = low_water_mark
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.concurrency = concurrency
+        self.reserved_tokens = reserved_tokens
+        self.refill_needed = None
+        self.semaphore = None
+        self.task = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def take(self):
+        """Returns a (word, definition) tuple, or None if the pool is empty."""
+        entry = self.entries.popleft() if self.entries else None
+
+        if len(self.entries) < self.low_water_mark and self.refill_needed is not None:
+            self.refill_needed.set()
+
+        return entry
+
+    async def wait_for_quota(self):
+        """Waits until the Wordnik quota has tokens to spare for the refill."""
+        if client.guard is None:
+            return
+
+        bucket = client.guard.bucket
+        tokens = min(self.reserved_tokens + 1, bucket.capacity)
+        while True:
+            wait = bucket.time_until_available(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    async def fetch_entry(self, word):
+        """Returns a (word, definition) tuple, or None if it has no definition."""
+        async with self.semaphore:
+            await self.wait_for_quota()
+            try:
+                # Same arguments as the commands, so they can reuse the cache
+                definitions = await get_definition(word)
+            except Exception:
+                return None
+
+        return (word, definitions[0]) if definitions else None
+
+    async def refill(self):
+        """Fetches a batch of random words with their definitions.
+
+        Returns the number of words added to the pool.
+        """
+        await self.wait_for_quota()
+        words = await get_random_words(limit=self.batch_size)
+        entries = await asyncio.gather(*(self.fetch_entry(word) for word in words))
+        added = 0
+
+        for entry in entries:
+            if entry is not None and len(self.entries) < self.capacity:
+                self.entries.append(entry)
+                added += 1
+
+        return added
+
+    async def run(self):
+        """Refills the pool every time it drops below the low-water mark."""
+        while True:
+            while len(self.entries) < self.capacity:
+                try:
+                    added = await self.refill()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Could not refill the random word pool: {e}")
+                    added = 0
+
+                if not added:
+                    await asyncio.sleep(self.retry_delay)
+
+            self.refill_needed.clear()
+            await self.refill_needed.wait()
+
+    def start(self, loop):
+        """Starts the background refill task."""
+        if self.task is None or self.task.done():
+            self.refill_needed = asyncio.Event()
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+            self.task = loop.create_task(self.run())
+
+    def stop(self):
+        """Stops the background refill task."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
@@ -0,0 +1,142 @@
+import os
+import asyncio
+from collections import deque
+
+import discord
+
+from .cache import MISSING, LRUCache
+from .logger import generate_logger
+from .resilience import TokenBucket
+
+# Discord allows about one reaction per 0.25 seconds in a channel
+REACTION_RATE = float(os.getenv("REACTION_RATE", "4"))
+REACTION_BURST = int(os.getenv("REACTION_BURST", "1"))
+
+logger = generate_logger(__name__)
+
+
+class ReactionRequest:
+    """Reactions to add to a message, in order."""
+
+    __slots__ = ("message", "emojis", "is_wanted", "on_done")
+
+    def __init__(self, message, emojis, is_wanted, on_done):
+        """Initialisation for ReactionRequest instance."""
+        self.message = message
+        self.emojis = deque(emojis)
+        self.is_wanted = is_wanted
+        self.on_done = on_done
+
+
+class ReactionPipeline:
+    """Adds reactions to messages in the background.
+
+    Every channel has its own queue, drained by a task that spaces the
+    requests to the channel's reaction rate limit, so sessions opened in a
+    burst do not run into 429 responses, and different channels proceed
+    concurrently. Messages of a channel take turns, so each gets its first
+    reactions quickly. Requests that are no longer wanted, for instance because
+    their paginator was closed, are dropped.
+    """
+
+    def __init__(self, *, rate=REACTION_RATE, burst=REACTION_BURST):
+        """Initialisation for ReactionPipeline instance."""
+        self.rate = rate
+        self.burst = burst
+        self.queues = {}
+        self.workers = {}
+
+        # Rate limiters of the recently used channels
+        self.buckets = LRUCache(1024)
+
+        # Counters
+        self.added = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def add(self, message, emojis, *, is_wanted=None, on_done=None):
+        """Queues reactions to add to a message.
+
+        `is_wanted` is checked before every reaction, and `on_done` is called
+        once every reaction of the request was handled.
+        """
+        channel_id = message.channel.id
+        request = ReactionRequest(message, emojis, is_wanted or (lambda: True), on_done)
+        self.queues.setdefault(channel_id, deque()).append(request)
+
+        if channel_id not in self.workers:
+            self.workers[channel_id] = asyncio.ensure_future(self.run(channel_id))
+
+    def get_bucket(self, channel_id):
+        """Returns the rate limiter of a channel."""
+        bucket = self.buckets.get(channel_id)
+        if bucket is MISSING:
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets.set(channel_id, bucket)
+        return bucket
+
+    async def run(self, channel_id):
+        """Adds the queued reactions of a channel, until none are left."""
+        queue = self.queues[channel_id]
+        bucket = self.get_bucket(channel_id)
+
+        try:
+            while queue:
+                request = queue[0]
+
+                if request.emojis and request.is_wanted():
+                    await asyncio.sleep(bucket.time_until_available())
+                    bucket.try_acquire()
+                    if not await self.add_reaction(request):
+                        self.dropped += len(request.emojis)
+                        request.emojis.clear()
+                else:
+                    self.dropped += len(request.emojis)
+                    request.emojis.clear()
+
+                # Messages of the channel take turns, one reaction at a time
+                if request.emojis:
+                    queue.rotate(-1)
+                else:
+                    queue.popleft()
+                    if request.on_done is not None:
+                        request.on_done()
+        finally:
+            del self.workers[channel_id]
+            del self.queues[channel_id]
+
+    async def add_reaction(self, request):
+        """Adds the next reaction of a request.
+
+        Returns False if the message can't get reactions anymore.
+        """
+        emoji = request.emojis.popleft()
+        try:
+            await request.message.add_reaction(emoji)
+        except (discord.NotFound, discord.Forbidden):
+            self.failed += 1
+            return False
+        except discord.HTTPException as e:
+            self.failed += 1
+            logger.warning(f"Could not add reaction {emoji}: {e}")
+            return True
+
+        self.added += 1
+        return True
+
+    def stats(self):
+        """Returns the reaction counters."""
+        return {
+            "queued": sum(
+                len(request.emojis)
+                for queue in self.queues.values()
+                for request in queue
+            ),
+            "added": self.added,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+# Process-wide pipeline shared by every paginator
+reaction_pipeline = ReactionPipeline()
@@ -0,0 +1,247 @@
+import time
+import asyncio
+
+from .deadlines import DeadlineExceeded
+from .logger import generate_logger
+
+logger = generate_logger(__name__)
+
+# Every upstream guard created by the bot, by name
+guards = {}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when a call is rejected without reaching the upstream API."""
+
+    def __init__(self, name, reason):
+        super().__init__(f"{name} is unavailable: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class TokenBucket:
+    """Token bucket rate limiter.
+
+    Parameters
+    ------------
+    rate: float
+        Tokens added per second.
+    capacity: float
+        Maximum number of tokens, which is the largest allowed burst.
+    """
+
+    def __init__(self, rate, capacity):
+        """Initialisation for TokenBucket instance."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        """Adds the tokens generated since the last update."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def try_acquire(self, tokens=1):
+        """Takes tokens if they are available right now."""
+        self.refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def time_until_available(self, tokens=1):
+        """Returns the seconds until enough tokens are available."""
+        self.refill()
+        missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    async def acquire(self, max_wait, tokens=1):
+        """Takes tokens, waiting up to max_wait seconds for them.
+
+        Returns False if they would not be available in time.
+        """
+        deadline = time.monotonic() + max_wait
+
+        while not self.try_acquire(tokens):
+            wait = self.time_until_available(tokens)
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+        return True
+
+
+class CircuitBreaker:
+    """Circuit breaker that opens after consecutive failures.
+
+    While open, calls are rejected immediately. Once `reset_timeout` seconds
+    have passed, a single trial call is let through (half-open), and its
+    outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        """Initialisation for CircuitBreaker instance."""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    def allow(self):
+        """Whether a call can go through."""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.set_state(self.HALF_OPEN)
+
+        if self.state == self.HALF_OPEN:
+            if self.trial_in_progress:
+                return False
+            self.trial_in_progress = True
+
+        return True
+
+    def record_success(self):
+        """Records a successful call."""
+        self.failures = 0
+        self.trial_in_progress = False
+        if self.state != self.CLOSED:
+            self.set_state(self.CLOSED)
+
+    def record_failure(self):
+        """Records a failed call."""
+        self.failures += 1
+        self.trial_in_progress = False
+
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != self.OPEN:
+                self.set_state(self.OPEN)
+
+    def record_ignored(self):
+        """Records a call whose outcome says nothing about the upstream health."""
+        self.trial_in_progress = False
+
+    def set_state(self, state):
+        """Changes the state of the circuit."""
+        logger.warning(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+        self.state = state
+
+
+class UpstreamGuard:
+    """Rate limiter and circuit breaker shared by every call to an upstream API.
+
+    Parameters
+    ------------
+    name: str
+        Name of the upstream, used in errors and monitoring.
+    rate_limit: float
+        Allowed requests per hour.
+    burst: int
+        Maximum number of requests allowed in a burst.
+    max_wait: float
+        Seconds a call may wait for the rate limiter before failing fast.
+    is_failure: Callable[[Exception], bool]
+        Whether an exception counts against the upstream health. Errors
+        caused by the request itself, such as a word not found, should not.
+    hedger: Hedger
+        Hedges the slow calls made with `call_hedged`, if given.
+    """
+
+    def __init__(
+        self,
+        name,
+        *,
+        rate_limit,
+        burst,
+        failure_threshold=5,
+        reset_timeout=30.0,
+        max_wait=2.0,
+        is_failure=None,
+        hedger=None,
+    ):
+        """Initialisation for UpstreamGuard instance."""
+        self.name = name
+        self.bucket = TokenBucket(rate_limit / 3600.0, burst)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.max_wait = max_wait
+        self.is_failure = is_failure or (lambda error: True)
+        self.hedger = hedger
+
+        # Counters
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+
+        guards[name] = self
+
+    async def call(self, func, *args, **kwargs):
+        """Calls a coroutine function through the rate limiter and circuit breaker."""
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, "circuit open")
+
+        if not await self.bucket.acquire(self.max_wait):
+            self.breaker.record_ignored()
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, "rate limit exceeded")
+
+        self.calls += 1
+        try:
+            result = await func(*args, **kwargs)
+        except (asyncio.CancelledError, DeadlineExceeded):
+            # The caller gave up, which says nothing about the upstream
+            self.breaker.record_ignored()
+            raise
+        except Exception as error:
+            if self.is_failure(error):
+                self.failures += 1
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+
+        self.breaker.record_success()
+        return result
+
+    async def call_hedged(self, func, *args, **kwargs):
+        """Calls an idempotent coroutine function, hedging it when it is slow.
+
+        The call and its duplicate both go through the rate limiter and
+        circuit breaker.
+        """
+        if self.hedger is None:
+            return await self.call(func, *args, **kwargs)
+        return await self.hedger.call(self.call, func, *args, **kwargs)
+
+    def state(self):
+        """Returns the state of the guard for monitoring."""
+        self.bucket.refill()
+        state = {
+            "name": self.name,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "tokens": int(self.bucket.tokens),
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+        if self.hedger is not None:
+            state.update(self.hedger.stats())
+        return state
+
+
+def get_upstream_states():
+    """Returns the state of every upstream guard."""
+    return [guard.state() for guard in guards.values()]
@@ -0,0 +1,122 @@
+import re
+
+# Sentence ending punctuation, optionally followed by closing quotes or brackets
+SENTENCE_END = re.compile(r"""(?<=[.!?…。！？])["'”’)\]]*(?=\s|$)|(?<=[。！？])""")
+WHITESPACE = re.compile(r"\s+")
+NEWLINE = re.compile(r"\n")
+
+
+def split_sentences(text):
+    """Splits a paragraph into sentences, without their surrounding whitespace."""
+    sentences = []
+    start = 0
+
+    for match in SENTENCE_END.finditer(text):
+        sentence = text[start : match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+
+    rest = text[start:].strip()
+    if rest:
+        sentences.append(rest)
+
+    return sentences
+
+
+def split_segments(text):
+    """Splits a text into sentences, each followed by the whitespace after it.
+
+    Returns the leading whitespace and a list of (sentence, separator)
+    tuples, so the text is the leading whitespace followed by every sentence
+    and its separator. Lines always end a sentence.
+    """
+    cuts = {match.end() for match in SENTENCE_END.finditer(text)}
+    cuts.update(match.start() for match in NEWLINE.finditer(text))
+
+    leading = ""
+    segments = []
+    start = 0
+
+    for cut in sorted(cuts) + [len(text)]:
+        piece = text[start:cut]
+        start = cut
+
+        sentence = piece.strip()
+        if not sentence:
+            before, after = piece, ""
+        else:
+            before = piece[: len(piece) - len(piece.lstrip())]
+            after = piece[len(piece.rstrip()) :]
+
+        # Whitespace before a sentence separates it from the previous one
+        if segments:
+            segments[-1][1] += before
+        else:
+            leading += before
+
+        if sentence:
+            segments.append([sentence, after])
+
+    return leading, [tuple(segment) for segment in segments]
+
+
+def split_words(text, max_characters):
+    """Splits a text longer than max_characters on whitespace.
+
+    Words longer than max_characters are cut.
+    """
+    pieces = []
+    current = ""
+
+    for word in WHITESPACE.split(text):
+        while len(word) > max_characters:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_characters])
+            word = word[max_characters:]
+
+        if current and len(current) + 1 + len(word) > max_characters:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+
+    if current:
+        pieces.append(current)
+
+    return pieces
+
+
+def chunk_text(text, max_characters):
+    """Splits text into chunks of whole sentences of at most max_characters.
+
+    Sentences are joined with spaces and paragraphs with newlines, so
+    joining the chunks with newlines or spaces gives back the text, up to
+    whitespace. Sentences longer than max_characters are split on words.
+    """
+    chunks = []
+    current = ""
+
+    for paragraph in text.split("\n"):
+        separator = "\n"
+
+        for sentence in split_sentences(paragraph):
+            if len(sentence) > max_characters:
+                pieces = split_words(sentence, max_characters)
+            else:
+                pieces = [sentence]
+
+            for piece in pieces:
+                if current and len(current) + 1 + len(piece) > max_characters:
+                    chunks.append(current)
+                    current = piece
+                else:
+                    current = f"{current}{separator}{piece}" if current else piece
+                separator = " "
+
+    if current:
+        chunks.append(current)
+
+    return chunks
@@ -0,0 +1,306 @@
+import os
+import math
+import asyncio
+import functools
+from collections import OrderedDict
+
+from .deadlines import LatencyTracker
+from .logger import generate_logger
+
+# Paginator sessions end after this many seconds without a reaction
+PAGINATOR_TIMEOUT = float(os.getenv("PAGINATOR_TIMEOUT", "120"))
+
+# Open sessions, in total and per user, before the least recently used is closed
+PAGINATOR_MAX_SESSIONS = int(os.getenv("PAGINATOR_MAX_SESSIONS", "1000"))
+PAGINATOR_MAX_USER_SESSIONS = int(os.getenv("PAGINATOR_MAX_USER_SESSIONS", "3"))
+
+logger = generate_logger(__name__)
+
+
+class Timer:
+    """Callback scheduled on a timer wheel."""
+
+    __slots__ = ("wheel", "rounds", "callback", "pending")
+
+    def __init__(self, wheel, rounds, callback):
+        """Initialisation for Timer instance."""
+        self.wheel = wheel
+        self.rounds = rounds
+        self.callback = callback
+        self.pending = True
+
+    def cancel(self):
+        """Prevents the callback from being called."""
+        if self.pending:
+            self.pending = False
+            self.wheel.pending -= 1
+
+
+class TimerWheel:
+    """Hashed timer wheel, firing every timer of the process from one task.
+
+    Timers are appended to the slot of the tick they are due at, so
+    scheduling and cancelling a timer are O(1), and a single task advances
+    one slot per tick, whatever the number of timers. Timers due after a
+    full turn of the wheel wait for the number of turns left. The task stops
+    once no timer is pending, and starts again with the next one.
+
+    Parameters
+    ------------
+    tick: float
+        Seconds between two slots, which is the precision of the timers.
+    slots: int
+        Number of slots of the wheel.
+    """
+
+    def __init__(self, tick=1.0, slots=128):
+        """Initialisation for TimerWheel instance."""
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.position = 0
+        self.pending = 0
+        self.task = None
+
+    def schedule(self, delay, callback):
+        """Calls a function (not a coroutine) after a delay, in seconds.
+
+        Returns a Timer, which can be cancelled.
+        """
+        ticks = max(1, math.ceil(delay / self.tick))
+        timer = Timer(self, (ticks - 1) // len(self.slots), callback)
+        self.slots[(self.position + ticks) % len(self.slots)].append(timer)
+        self.pending += 1
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+        return timer
+
+    def advance(self):
+        """Moves to the next slot and fires its due timers."""
+        self.position = (self.position + 1) % len(self.slots)
+        timers = self.slots[self.position]
+        self.slots[self.position] = []
+
+        for timer in timers:
+            if not timer.pending:
+                continue
+
+            if timer.rounds:
+                timer.rounds -= 1
+                self.slots[self.position].append(timer)
+                continue
+
+            timer.pending = False
+            self.pending -= 1
+            try:
+                timer.callback()
+            except Exception as e:
+                logger.error(f"Timer callback failed: {e}")
+
+    async def run(self):
+        """Advances the wheel every tick, without drifting, while timers are pending."""
+        loop = asyncio.get_event_loop()
+        next_tick = loop.time()
+
+        while self.pending:
+            next_tick += self.tick
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            self.advance()
+
+        # Only cancelled timers are left
+        self.slots = [[] for _ in self.slots]
+        self.task = None
+
+    def stop(self):
+        """Stops the wheel task, dropping every timer."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+        for slot in self.slots:
+            for timer in slot:
+                timer.pending = False
+        self.slots = [[] for _ in self.slots]
+        self.pending = 0
+
+
+class PaginatorSession:
+    """Registry entry of an open paginator."""
+
+    __slots__ = (
+        "pages",
+        "message_id",
+        "user_id",
+        "started_at",
+        "last_active",
+        "idle_timer",
+        "restore_timer",
+        "controls_ready",
+    )
+
+    def __init__(self, pages, message_id, user_id, started_at, now):
+        """Initialisation for PaginatorSession instance."""
+        self.pages = pages
+        self.message_id = message_id
+        self.user_id = user_id
+        self.started_at = started_at
+        self.last_active = now
+        self.idle_timer = None
+        self.restore_timer = None
+        self.controls_ready = False
+
+
+class SessionManager:
+    """Registry of the open paginator sessions.
+
+    A single `raw_reaction_add` listener is added to the bot, and sessions
+    are found by message id, so every reaction event costs a dict lookup
+    however many paginators are open. Idle sessions are closed, and pages
+    shown temporarily are restored, by timers on a shared timer wheel
+    instead of a sleeping task per session.
+
+    The number of open sessions is capped, in total and per user, by
+    closing the least recently used session.
+
+    The time from the start of a session until its first page can be used
+    (time to interactive), and until all its controls were added, are
+    measured for every session.
+    """
+
+    def __init__(
+        self,
+        *,
+        timeout=PAGINATOR_TIMEOUT,
+        max_sessions=PAGINATOR_MAX_SESSIONS,
+        max_user_sessions=PAGINATOR_MAX_USER_SESSIONS,
+        wheel=None,
+    ):
+        """Initialisation for SessionManager instance."""
+        self.timeout = timeout
+        self.max_sessions = max_sessions
+        self.max_user_sessions = max_user_sessions
+        self.wheel = wheel or TimerWheel()
+        self.bot = None
+        self.sessions = OrderedDict()
+        self.user_sessions = {}
+
+        # Counters
+        self.expired = 0
+        self.evicted = 0
+        self.time_to_interactive = LatencyTracker(1000, min_samples=1)
+        self.time_to_controls = LatencyTracker(1000, min_samples=1)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def attach(self, bot):
+        """Listens to the reaction events of a bot, once."""
+        if self.bot is not bot:
+            bot.add_listener(self.on_raw_reaction_add, "on_raw_reaction_add")
+            self.bot = bot
+
+    def now(self):
+        """Returns the current time of the event loop."""
+        return asyncio.get_event_loop().time()
+
+    def register(self, pages, message_id, user_id, started_at):
+        """Routes the reactions of a message to a paginator, usable from now on.
+
+        Returns the session, after closing the least recently used sessions
+        over the limits.
+        """
+        while len(self.user_sessions.get(user_id, ())) >= self.max_user_sessions:
+            self.evict(next(iter(self.user_sessions[user_id].values())))
+        while len(self.sessions) >= self.max_sessions:
+            self.evict(next(iter(self.sessions.values())))
+
+        now = self.now()
+        session = PaginatorSession(pages, message_id, user_id, started_at, now)
+        self.time_to_interactive.record(now - started_at)
+        self.sessions[message_id] = session
+        self.user_sessions.setdefault(user_id, OrderedDict())[message_id] = session
+        self.schedule_expiry(session, self.timeout)
+        return session
+
+    def unregister(self, session):
+        """Stops routing the reactions of a message, and cancels its timers."""
+        if self.sessions.get(session.message_id) is not session:
+            return
+
+        del self.sessions[session.message_id]
+        user_sessions = self.user_sessions[session.user_id]
+        del user_sessions[session.message_id]
+        if not user_sessions:
+            del self.user_sessions[session.user_id]
+
+        for timer in (session.idle_timer, session.restore_timer):
+            if timer is not None:
+                timer.cancel()
+
+    def touch(self, session):
+        """Marks a session as used right now."""
+        session.last_active = self.now()
+        if self.sessions.get(session.message_id) is session:
+            self.sessions.move_to_end(session.message_id)
+            self.user_sessions[session.user_id].move_to_end(session.message_id)
+
+    def controls_added(self, session):
+        """Records the time a session took to get all its controls, once."""
+        if not session.controls_ready:
+            session.controls_ready = True
+            self.time_to_controls.record(self.now() - session.started_at)
+
+    def evict(self, session):
+        """Closes a session to make room for a new one."""
+        self.evicted += 1
+        self.unregister(session)
+        session.pages.expire()
+
+    def schedule_expiry(self, session, delay):
+        """Checks whether a session is idle after a delay."""
+        session.idle_timer = self.wheel.schedule(
+            delay, functools.partial(self.check_idle, session)
+        )
+
+    def check_idle(self, session):
+        """Closes a session idle for too long, or checks again later."""
+        if self.sessions.get(session.message_id) is not session:
+            return
+
+        idle_time = self.now() - session.last_active
+        if idle_time < self.timeout:
+            self.schedule_expiry(session, self.timeout - idle_time)
+            return
+
+        self.expired += 1
+        self.unregister(session)
+        session.pages.expire()
+
+    def schedule_restore(self, session, delay, callback):
+        """Calls a function after a delay, replacing the previous one."""
+        if session.restore_timer is not None:
+            session.restore_timer.cancel()
+        session.restore_timer = self.wheel.schedule(delay, callback)
+
+    async def on_raw_reaction_add(self, payload):
+        """Hands a reaction to the session of its message, if any."""
+        session = self.sessions.get(payload.message_id)
+        if session is not None:
+            session.pages.on_reaction(payload)
+
+    def stats(self):
+        """Returns the session counters."""
+        return {
+            "sessions": len(self.sessions),
+            "users": len(self.user_sessions),
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "time_to_interactive_p50": self.time_to_interactive.percentile(0.5),
+            "time_to_interactive_p95": self.time_to_interactive.percentile(0.95),
+            "time_to_controls_p50": self.time_to_controls.percentile(0.5),
+            "time_to_controls_p95": self.time_to_controls.percentile(0.95),
+        }
+
+
+# Process-wide registry shared by every paginator
+paginator_sessions = SessionManager()
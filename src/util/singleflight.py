@@ -0,0 +1,112 @@
+import asyncio
+import functools
+
+from .cache import make_key
+from .deadlines import DeadlineExceeded, remaining_time, within_deadline
+
+
+class Flight:
+    """A shared call in flight and the number of callers waiting for it."""
+
+    def __init__(self, task):
+        """Initialisation for Flight instance."""
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into a single upstream call.
+
+    The first caller for a key starts the call as a task, every caller that
+    arrives while it is in flight awaits the same task, so the result (or
+    the exception) is fanned out to all of them. The shared call runs with
+    the deadline of the caller that started it, and every waiter only waits
+    until its own deadline. A waiter with a later deadline starts a new call
+    if the shared one runs out of time. Cancelling one waiter does not
+    cancel the shared call, unless it was the last one waiting for it.
+    """
+
+    def __init__(self, name):
+        """Initialisation for SingleFlight instance."""
+        self.name = name
+        self.calls = {}
+
+        # Counters
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self.calls)
+
+    async def do(self, key, func, *args, **kwargs):
+        """Runs a coroutine function once for all concurrent callers of a key."""
+        while True:
+            flight = self.calls.get(key)
+
+            if flight is None:
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                flight = Flight(task)
+                task.add_done_callback(functools.partial(self.finished, key, flight))
+                self.calls[key] = flight
+                self.started += 1
+            else:
+                self.coalesced += 1
+
+            flight.waiters += 1
+            try:
+                return await within_deadline(asyncio.shield(flight.task))
+            except DeadlineExceeded:
+                if not self.ran_out_of_time(flight):
+                    raise
+            finally:
+                flight.waiters -= 1
+                if not flight.waiters and not flight.task.done():
+                    # Nobody is waiting for the result anymore
+                    self.forget(key, flight)
+                    flight.task.cancel()
+
+    def ran_out_of_time(self, flight):
+        """Whether a shared call hit its deadline before the current one."""
+        if not flight.task.done() or flight.task.cancelled():
+            return False
+        if not isinstance(flight.task.exception(), DeadlineExceeded):
+            return False
+
+        remaining = remaining_time()
+        return remaining is None or remaining > 0
+
+    def forget(self, key, flight):
+        """Removes a call, so the next caller starts a new one."""
+        if self.calls.get(key) is flight:
+            del self.calls[key]
+
+    def finished(self, key, flight, task):
+        """Forgets a finished call."""
+        self.forget(key, flight)
+
+        # Mark the exception as retrieved if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self):
+        """Returns the coalescing counters."""
+        return {
+            "name": self.name,
+            "in_flight": len(self.calls),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+
+def coalesced(group):
+    """Decorator that coalesces concurrent identical calls of a coroutine function."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = make_key(func, args, kwargs)
+            return await group.do(key, func, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,248 @@
+import os
+import re
+from os.path import dirname, abspath, join, exists, commonprefix
+
+from .lexicon import local_dictionary
+from .logger import generate_logger
+
+BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
+SPELLING_VOCABULARY_PATH = os.getenv("SPELLING_VOCABULARY_PATH") or join(
+    BASE_PROJECT_PATH, "data", "input", "vocabulary.txt"
+)
+
+# Whether all unknown words are answered with suggestions only, not just typos
+SPELLING_STRICT = (os.getenv("SPELLING_STRICT") or "false").lower() == "true"
+
+# Words made of letters, optionally joined by spaces, hyphens or apostrophes
+WORD_PATTERN = re.compile(r"^[^\W\d_]+(?:[\s'\-][^\W\d_]+)*$")
+MAX_WORD_LENGTH = 45
+
+logger = generate_logger(__name__)
+
+
+def looks_like_word(word):
+    """Whether a string could be a dictionary word at all."""
+    return len(word) <= MAX_WORD_LENGTH and WORD_PATTERN.match(word) is not None
+
+
+def within_edits(source, target, max_distance):
+    """Whether two strings are at most max_distance edits apart.
+
+    Edits are insertions, deletions, substitutions and transpositions of two
+    adjacent characters, as in the optimal string alignment distance. Only
+    the edits fixing the first difference are tried, which is fast for the
+    small distances of spelling mistakes.
+    """
+    if abs(len(source) - len(target)) > max_distance:
+        return False
+
+    # Each edit brings in or leaves out at most one character of either string
+    if (
+        len(set(source).difference(target)) > max_distance
+        or len(set(target).difference(source)) > max_distance
+    ):
+        return False
+
+    # The common prefix does not change the distance
+    prefix = len(commonprefix((source, target)))
+    source, target = source[prefix:], target[prefix:]
+
+    if not source or not target:
+        return True
+    if max_distance == 0:
+        return False
+
+    max_distance -= 1
+    return (
+        within_edits(source[1:], target[1:], max_distance)
+        or within_edits(source[1:], target, max_distance)
+        or within_edits(source, target[1:], max_distance)
+        or (
+            source[1:2] == target[:1]
+            and source[:1] == target[1:2]
+            and within_edits(source[2:], target[2:], max_distance)
+        )
+    )
+
+
+class SpellingIndex:
+    """SymSpell-style deletion dictionary for spelling suggestions.
+
+    Every known word is indexed under all the strings obtained by deleting
+    up to `max_edit_distance` characters from its prefix. A lookup generates
+    the deletes of the misspelled word and only verifies the few words
+    sharing one of them, instead of comparing against the whole vocabulary.
+    Words one edit away are looked for first, and the search only widens
+    when there are none.
+    """
+
+    def __init__(self, max_edit_distance=2, prefix_length=6):
+        """Initialisation for SpellingIndex instance."""
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.words = {}
+
+        # Words by delete, one dictionary per number of deleted characters
+        self.deletes = [{} for _ in range(max_edit_distance + 1)]
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word.lower() in self.words
+
+    def generate_deletes(self, word, max_edit_distance):
+        """Returns the strings obtained by deleting characters from a word prefix.
+
+        They are grouped by number of deleted characters, from none to
+        max_edit_distance.
+        """
+        prefix = word[: self.prefix_length]
+        levels = [{prefix}]
+        seen = {prefix}
+
+        for _ in range(max_edit_distance):
+            level = {
+                candidate[:index] + candidate[index + 1 :]
+                for candidate in levels[-1]
+                for index in range(len(candidate))
+            }
+            level -= seen
+            seen |= level
+            levels.append(level)
+
+        return levels
+
+    def add(self, word, frequency=1):
+        """Adds a word to the index."""
+        word = word.lower()
+
+        if word in self.words:
+            self.words[word] = max(self.words[word], frequency)
+            return
+
+        self.words[word] = frequency
+        levels = self.generate_deletes(word, self.max_edit_distance)
+        for deletes, level in zip(self.deletes, levels):
+            for delete in level:
+                deletes.setdefault(delete, []).append(word)
+
+    def candidates(self, word, levels, distance):
+        """Returns the known words that may be `distance` edits away from a word."""
+        candidates = set()
+
+        for level in levels[: distance + 1]:
+            for deletes in self.deletes[: distance + 1]:
+                for delete in level:
+                    candidates.update(deletes.get(delete, ()))
+
+        # Most frequent words first
+        return sorted(
+            (
+                candidate
+                for candidate in candidates
+                if abs(len(candidate) - len(word)) <= distance
+            ),
+            key=lambda candidate: (-self.words[candidate], candidate),
+        )
+
+    def lookup(self, word, max_suggestions=5, max_edit_distance=None):
+        """Returns suggestions as (word, distance) tuples, closest first.
+
+        Only the closest known words are returned: words two edits away are
+        not suggested if some are one edit away.
+        """
+        word = word.lower()
+        if word in self.words:
+            return [(word, 0)]
+
+        if max_edit_distance is None:
+            max_edit_distance = self.max_edit_distance
+        levels = self.generate_deletes(word, max_edit_distance)
+
+        for distance in range(1, max_edit_distance + 1):
+            suggestions = []
+
+            for candidate in self.candidates(word, levels, distance):
+                if within_edits(word, candidate, distance):
+                    suggestions.append((candidate, distance))
+                    if len(suggestions) == max_suggestions:
+                        break
+
+            if suggestions:
+                return suggestions
+
+        return []
+
+    def suggest(self, word, max_suggestions=5):
+        """Returns the suggested words for a misspelled word."""
+        return [
+            suggestion
+            for suggestion, distance in self.lookup(word, max_suggestions)
+            if distance > 0
+        ]
+
+
+def read_vocabulary(path):
+    """Yields (word, frequency) tuples from a vocabulary file.
+
+    Each line holds a word, optionally followed by its frequency.
+    """
+    with open(path, encoding="utf-8") as vocabulary_file:
+        for line in vocabulary_file:
+            fields = line.split()
+            if not fields:
+                continue
+
+            frequency = int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else 1
+            yield fields[0], frequency
+
+
+def build_spelling_index(vocabulary_path=SPELLING_VOCABULARY_PATH):
+    """Builds a spelling index over the local lexicon and vocabulary file.
+
+    Lexicon headwords are weighted by their number of definitions, a rough
+    proxy for how common a word is.
+    """
+    index = SpellingIndex()
+
+    lexicon = local_dictionary.open()
+    if lexicon is not None:
+        for headword in lexicon.headwords():
+            if " " not in headword and looks_like_word(headword):
+                entry = lexicon.get(headword)
+                index.add(headword, len(entry["definitions"]))
+
+    if exists(vocabulary_path):
+        for word, frequency in read_vocabulary(vocabulary_path):
+            if looks_like_word(word):
+                index.add(word, frequency)
+    else:
+        logger.warning(f"Spelling vocabulary not found at {vocabulary_path}")
+
+    if len(index) == 0:
+        logger.warning(
+            "Spelling suggestions are disabled, as there is neither a lexicon "
+            "nor a vocabulary file"
+        )
+    else:
+        logger.info(f"Spelling index built with {len(index)} words")
+    return index
+
+
+# Process-wide spelling index, built in the background by load_spelling_index
+spelling_index = None
+
+
+def load_spelling_index():
+    """Builds the process-wide spelling index (blocking)."""
+    global spelling_index
+    spelling_index = build_spelling_index()
+    return spelling_index
+
+
+def get_spelling_index():
+    """Returns the spelling index, or None if it is not ready or empty."""
+    if spelling_index is None or len(spelling_index) == 0:
+        return None
+    return spelling_index
@@ -0,0 +1,296 @@
+import os
+import re
+import asyncio
+import hashlib
+from os.path import join
+
+from .cache import CACHE_PATH, MISSING, LRUCache, TieredCache, SQLiteStore
+from .segmentation import split_segments
+from .translator import translate_text, translate_uncached
+
+TRANSLATION_MEMORY_SIZE = int(os.getenv("TRANSLATION_MEMORY_SIZE", "4096"))
+TRANSLATION_MEMORY_MAX_ENTRIES = int(
+    os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "500000")
+)
+TRANSLATION_MEMORY_FUZZY_SIZE = int(os.getenv("TRANSLATION_MEMORY_FUZZY_SIZE", "20000"))
+TRANSLATION_MEMORY_TTL = float(os.getenv("TRANSLATION_MEMORY_TTL", str(90 * 86400)))
+
+# URLs, custom emojis, mentions and numbers are never translated
+ENTITY_PATTERN = re.compile(
+    r"https?://\S+|<a?:\w+:\d+>|<(?:@[!&]?|#)\d+>|\d+(?:[.,]\d+)*"
+)
+
+# Placeholders stored in the memory (a slot number between private use
+# characters), and their form sent to the Translate API
+SLOT = "\ue000{}\ue001"
+SLOT_PATTERN = re.compile("\ue000(\\d+)\ue001")
+API_PLACEHOLDER = '<span translate="no">{}</span>'
+API_PLACEHOLDER_PATTERN = re.compile(r'<span translate="no">\s*(\d+)\s*</span>')
+
+# Languages written without spaces between sentences
+UNSPACED_LANGUAGES = {"ja", "zh", "zh-cn", "zh-tw"}
+
+# Fuzzy matches may differ by a single name, in segments of these many words
+MIN_FUZZY_WORDS = 4
+MAX_FUZZY_WORDS = 40
+NAME_PATTERN = re.compile(r"^[^\W\d_][^\W\d_'\-]*$")
+
+
+def mask_entities(segment):
+    """Replaces the entities of a segment with numbered slots.
+
+    Returns the masked segment and the replaced values, in slot order.
+    """
+    values = []
+
+    def replace(match):
+        values.append(match.group(0))
+        return SLOT.format(len(values) - 1)
+
+    return ENTITY_PATTERN.sub(replace, segment), values
+
+
+def fill_slots(template, values):
+    """Replaces the numbered slots of a template with their values."""
+    return SLOT_PATTERN.sub(lambda match: values[int(match.group(1))], template)
+
+
+def parse_placeholders(translation, slot_count):
+    """Turns the placeholders of a translation back into slots.
+
+    Returns None if the translation lost or duplicated a placeholder.
+    """
+    template = API_PLACEHOLDER_PATTERN.sub(
+        lambda match: SLOT.format(match.group(1)), translation
+    )
+    slots = sorted(int(index) for index in SLOT_PATTERN.findall(template))
+    return template if slots == list(range(slot_count)) else None
+
+
+def is_name(word):
+    """Whether a word looks like a name, which translations keep as-is."""
+    return word[:1].isupper() and NAME_PATTERN.match(word) is not None
+
+
+def skeletons(words):
+    """Yields (position, skeleton) tuples, with one name of a segment left out.
+
+    The first word is never left out, since it is capitalized anyway.
+    """
+    for position, word in enumerate(words[1:], 1):
+        if is_name(word):
+            yield position, " ".join(words[:position] + ["*"] + words[position + 1 :])
+
+
+def sentence_separator(separator, target_language):
+    """Returns the whitespace between two translated sentences.
+
+    Line breaks are kept, spaces depend on the target language.
+    """
+    if "\n" in separator:
+        return separator
+    if target_language.lower() in UNSPACED_LANGUAGES:
+        return ""
+    return separator or " "
+
+
+async def gather_or_cancel(tasks):
+    """Waits for tasks, cancelling the others as soon as one fails."""
+    tasks = list(tasks)
+    try:
+        await asyncio.gather(*tasks)
+    except Exception:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+class TranslationMemory:
+    """Segment-level translation memory.
+
+    Texts are split into sentences, and numbers, URLs, mentions and emojis
+    are replaced by placeholders, so segments differing only by them share
+    a single translation. Segments are reused when they exactly match a
+    translated segment, or when they differ from one by a single name that
+    was kept as-is in its translation. Only the novel segments are sent to
+    the Translate API.
+    """
+
+    def __init__(
+        self,
+        *,
+        memory_size=TRANSLATION_MEMORY_SIZE,
+        max_entries=TRANSLATION_MEMORY_MAX_ENTRIES,
+        fuzzy_size=TRANSLATION_MEMORY_FUZZY_SIZE,
+        ttl=TRANSLATION_MEMORY_TTL,
+    ):
+        """Initialisation for TranslationMemory instance."""
+        self.segments = TieredCache(
+            "translation_memory",
+            memory_size=memory_size,
+            store=SQLiteStore(
+                join(CACHE_PATH, "translation_memory.sqlite3"),
+                max_entries=max_entries,
+            ),
+            default_ttl=ttl,
+        )
+        self.fuzzy_index = LRUCache(fuzzy_size)
+
+        # Counters
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def segment_key(self, target_language, model, masked):
+        """Key of a masked segment's translation."""
+        digest = hashlib.sha256(masked.encode("utf-8")).hexdigest()
+        return f"{target_language}:{model}:{digest}"
+
+    def index(self, target_language, model, masked, template):
+        """Indexes a translated segment for fuzzy matches."""
+        words = masked.split()
+        if not MIN_FUZZY_WORDS <= len(words) <= MAX_FUZZY_WORDS:
+            return
+
+        for position, skeleton in skeletons(words):
+            key = f"{target_language}:{model}:{skeleton}"
+            self.fuzzy_index.set(key, (words[position], template))
+
+    def store(self, target_language, model, masked, template):
+        """Stores the translation of a masked segment."""
+        self.segments.set(self.segment_key(target_language, model, masked), template)
+        self.index(target_language, model, masked, template)
+
+    def find_fuzzy(self, target_language, model, masked):
+        """Returns the template of a segment differing by one name, or None."""
+        words = masked.split()
+        if not MIN_FUZZY_WORDS <= len(words) <= MAX_FUZZY_WORDS:
+            return None
+
+        for position, skeleton in skeletons(words):
+            match = self.fuzzy_index.get(f"{target_language}:{model}:{skeleton}")
+            if match is MISSING:
+                continue
+
+            old_word, template = match
+            old_word_pattern = re.compile(rf"(?<!\w){re.escape(old_word)}(?!\w)")
+            if len(old_word_pattern.findall(template)) == 1:
+                return old_word_pattern.sub(lambda _: words[position], template)
+
+        return None
+
+    async def find(self, target_language, model, masked):
+        """Returns the template of a masked segment, or None."""
+        template = await self.segments.get(
+            self.segment_key(target_language, model, masked)
+        )
+        if template is not MISSING:
+            self.exact_hits += 1
+            self.index(target_language, model, masked, template)
+            return template
+
+        template = self.find_fuzzy(target_language, model, masked)
+        if template is not None:
+            self.fuzzy_hits += 1
+            return template
+
+        self.misses += 1
+        return None
+
+    async def translate_template(self, target_language, model, masked, slot_count):
+        """Translates a novel masked segment, and stores its template.
+
+        Returns None if the placeholders did not survive the translation.
+        """
+        api_text = SLOT_PATTERN.sub(
+            lambda match: API_PLACEHOLDER.format(match.group(1)), masked
+        )
+        # The template is stored in the memory, not in the translation cache
+        translation = await translate_uncached(target_language, api_text, model)
+
+        template = parse_placeholders(translation, slot_count)
+        if template is not None:
+            self.store(target_language, model, masked, template)
+        return template
+
+    async def translate(self, target_language, text, model="nmt"):
+        """Translates text, reusing the translations of known segments."""
+        leading, source_segments = split_segments(text)
+        segments = []
+        templates = {}
+
+        for segment, separator in source_segments:
+            masked, values = mask_entities(segment)
+
+            if masked not in templates:
+                template = await self.find(target_language, model, masked)
+                if template is not None:
+                    segments.append((fill_slots(template, values), separator))
+                    continue
+
+                templates[masked] = asyncio.ensure_future(
+                    self.translate_template(target_language, model, masked, len(values))
+                )
+
+            segments.append(((segment, masked, values), separator))
+
+        await gather_or_cancel(templates.values())
+
+        # Segments whose placeholders were mangled are translated as they are
+        fallbacks = {}
+        for segment, _ in segments:
+            if isinstance(segment, tuple) and templates[segment[1]].result() is None:
+                fallbacks[segment[0]] = asyncio.ensure_future(
+                    translate_text(target_language, segment[0], model)
+                )
+
+        await gather_or_cancel(fallbacks.values())
+
+        def render(segment):
+            if not isinstance(segment, tuple):
+                return segment
+
+            text, masked, values = segment
+            template = templates[masked].result()
+            if template is None:
+                return fallbacks[text].result()
+            return fill_slots(template, values)
+
+        # The whitespace after the last sentence is kept as-is
+        parts = [leading]
+        for index, (segment, separator) in enumerate(segments, 1):
+            parts.append(render(segment))
+            if index < len(segments):
+                separator = sentence_separator(separator, target_language)
+            parts.append(separator)
+
+        return "".join(parts)
+
+    async def stats(self):
+        """Returns the segment reuse counters."""
+        lookups = self.exact_hits + self.fuzzy_hits + self.misses
+        stored_segments, _ = await self.segments.store.counts()
+        return {
+            "segments": len(self.segments.memory),
+            "stored_segments": stored_segments,
+            "exact_hits": self.exact_hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "hit_ratio": (
+                (self.exact_hits + self.fuzzy_hits) / lookups if lookups else 0.0
+            ),
+        }
+
+
+# Process-wide translation memory
+translation_memory = TranslationMemory()
+
+
+async def translate_with_memory(target_language, text, model="nmt"):
+    """Translates text, only sending the segments never translated before."""
+    return await translation_memory.translate(target_language, text, model)
+
+
+async def get_translation_memory_stats():
+    """Returns the counters of the translation memory."""
+    return await translation_memory.stats()
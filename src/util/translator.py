@@ -1,59 +1,412 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+import unicodedata
+from collections import deque
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from os.path import dirname, abspath, join
 import six
 
+from .batching import MicroBatcher
+from .cache import CACHE_PATH, TieredCache, SQLiteStore, cached
+from .deadlines import Hedger, within_deadline
+from .language_detection import LANGUAGE_DETECTION_MIN_CONFIDENCE, language_detector
+from .logger import generate_logger
+from .resilience import UpstreamGuard
+from .segmentation import chunk_text
+from .singleflight import SingleFlight, coalesced
+
 BASE_PROJECT_PATH = dirname(dirname(dirname((abspath(__file__)))))
 TRANSLATION_KEY_PATH = join(BASE_PROJECT_PATH, ".envs", ".local")
+TRANSLATION_KEY_FILE = os.getenv("TRANSLATION_KEY_FILE") or join(
+    TRANSLATION_KEY_PATH, "knowledge-bot-development-b8ed9d8c16cb.json"
+)
 
+# Alternative Translate API endpoint, such as the fake upstream used for load
+# testing (util.fake_upstreams), called without credentials
+TRANSLATE_API_URL = os.getenv("TRANSLATE_API_URL")
 
-def detect_language(text):
-    """Detects the text's language."""
-    from google.cloud import translate_v2 as translate
+# Threads (and pooled HTTP connections) dedicated to Translate API calls
+TRANSLATE_MAX_WORKERS = int(os.getenv("TRANSLATE_MAX_WORKERS", "8"))
 
-    translate_client = translate.Client.from_service_account_json(
-        TRANSLATION_KEY_PATH + "/knowledge-bot-development-b8ed9d8c16cb.json"
-    )
+# Translations and detected languages are cached, bounded by size in bytes
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "4096"))
+TRANSLATION_CACHE_MEMORY_BYTES = int(
+    os.getenv("TRANSLATION_CACHE_MEMORY_BYTES", str(16 * 1024 * 1024))
+)
+TRANSLATION_CACHE_MAX_ENTRIES = int(
+    os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", "200000")
+)
+TRANSLATION_CACHE_MAX_BYTES = int(
+    os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+TRANSLATION_CACHE_TTL = float(os.getenv("TRANSLATION_CACHE_TTL", str(30 * 86400)))
 
-    result = translate_client.detect_language(text)
-    return str(result["language"])
+# Concurrent calls arriving within the delay (seconds) are sent as one request,
+# within the API limits of 128 values and 30,000 characters per request
+TRANSLATE_BATCH_DELAY = float(os.getenv("TRANSLATE_BATCH_DELAY", "0.005"))
+TRANSLATE_BATCH_SIZE = int(os.getenv("TRANSLATE_BATCH_SIZE", "128"))
+TRANSLATE_BATCH_CHARACTERS = int(os.getenv("TRANSLATE_BATCH_CHARACTERS", "30000"))
 
+# Long texts are translated in chunks of whole sentences, a few at a time
+TRANSLATE_CHUNK_CHARACTERS = int(os.getenv("TRANSLATE_CHUNK_CHARACTERS", "1500"))
+TRANSLATE_CHUNK_WINDOW = int(os.getenv("TRANSLATE_CHUNK_WINDOW", "4"))
 
-def list_languages(target_language="english"):
-    """List alll languages available."""
-    from google.cloud import translate_v2 as translate
+# Quota (requests per hour) and circuit breaker settings
+TRANSLATE_RATE_LIMIT = float(os.getenv("TRANSLATE_RATE_LIMIT", "36000"))
+TRANSLATE_RATE_BURST = int(os.getenv("TRANSLATE_RATE_BURST", "50"))
+TRANSLATE_FAILURE_THRESHOLD = int(os.getenv("TRANSLATE_FAILURE_THRESHOLD", "5"))
+TRANSLATE_RESET_TIMEOUT = float(os.getenv("TRANSLATE_RESET_TIMEOUT", "30"))
 
-    translate_client = translate.Client.from_service_account_json(
-        TRANSLATION_KEY_PATH + "/knowledge-bot-development-b8ed9d8c16cb.json"
-    ).from_service_account_json()
+# Slow batches can be sent a second time, at the cost of extra quota
+TRANSLATE_HEDGE = (os.getenv("TRANSLATE_HEDGE") or "false").lower() == "true"
+TRANSLATE_HEDGE_PERCENTILE = float(os.getenv("TRANSLATE_HEDGE_PERCENTILE", "0.95"))
 
-    languages = translate_client.get_languages(target_language=target_language)
 
-    for language in languages:
-        print("{name} ({language})".format(**language))
+def is_translate_failure(error):
+    """Whether an error means the Translate API is unhealthy, not a bad request."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code == 429 or code >= 500
+    return True
 
 
-def translate_text(target_language, text, model="nmt"):
-    """Translates text into the target language.
+# Every Translate API call goes through the same rate limiter and circuit breaker
+translate_guard = UpstreamGuard(
+    "translate",
+    rate_limit=TRANSLATE_RATE_LIMIT,
+    burst=TRANSLATE_RATE_BURST,
+    failure_threshold=TRANSLATE_FAILURE_THRESHOLD,
+    reset_timeout=TRANSLATE_RESET_TIMEOUT,
+    is_failure=is_translate_failure,
+    hedger=Hedger(
+        "translate", percentile=TRANSLATE_HEDGE_PERCENTILE, enabled=TRANSLATE_HEDGE
+    ),
+)
 
-    Target must be an ISO 639-1 lanfuage code.
+translation_cache = TieredCache(
+    "translation",
+    memory_size=TRANSLATION_CACHE_SIZE,
+    memory_bytes=TRANSLATION_CACHE_MEMORY_BYTES,
+    store=SQLiteStore(
+        join(CACHE_PATH, "translation.sqlite3"),
+        max_entries=TRANSLATION_CACHE_MAX_ENTRIES,
+        max_bytes=TRANSLATION_CACHE_MAX_BYTES,
+    ),
+)
+
+# Concurrent identical requests share a single Translate API call
+translate_calls = SingleFlight("translate")
+
+# Blocking Translate API calls run here, never on the event loop
+executor = ThreadPoolExecutor(
+    max_workers=TRANSLATE_MAX_WORKERS, thread_name_prefix="translate"
+)
+
+logger = generate_logger(__name__)
+
+
+class TranslateClient:
+    """Process-wide Google Translate client.
+
+    The client is created once, on first use, so the key file is only read
+    and parsed once and every call reuses the same authorized session and
+    its connection pool. Credentials are refreshed in the background before
+    they expire, so calls never wait for a token refresh.
     """
-    from google.cloud import translate_v2 as translate
 
-    translate_client = translate.Client.from_service_account_json(
-        TRANSLATION_KEY_PATH + "/knowledge-bot-development-b8ed9d8c16cb.json"
-    )
+    def __init__(
+        self, key_file=TRANSLATION_KEY_FILE, max_connections=TRANSLATE_MAX_WORKERS
+    ):
+        """Initialisation for TranslateClient instance."""
+        self.key_file = key_file
+        self.max_connections = max_connections
+        self.client = None
+        self.lock = threading.Lock()
+        self.refresh_task = None
+
+    def get(self):
+        """Returns the Translate client, creating it if needed (blocking)."""
+        if self.client is None:
+            with self.lock:
+                if self.client is None:
+                    self.client = self.create()
+        return self.client
+
+    def create(self):
+        """Creates the Translate client and sizes its connection pool."""
+        from google.cloud import translate_v2 as translate
+        from requests.adapters import HTTPAdapter
+
+        if TRANSLATE_API_URL:
+            from google.auth.credentials import AnonymousCredentials
+
+            client = translate.Client(
+                credentials=AnonymousCredentials(),
+                client_options={"api_endpoint": TRANSLATE_API_URL},
+            )
+        else:
+            client = translate.Client.from_service_account_json(self.key_file)
+
+        # Keep a pooled connection for every executor thread
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        client._http.mount("https://", adapter)
+        client._http.mount("http://", adapter)
+
+        return client
+
+    def refresh_credentials(self, margin=timedelta(minutes=5)):
+        """Refreshes the access token if it expires soon (blocking)."""
+        from google.auth.transport.requests import Request
+
+        credentials = self.get()._credentials
+        expiry = getattr(credentials, "expiry", None)
+
+        if not credentials.valid or (
+            expiry is not None and expiry - datetime.utcnow() < margin
+        ):
+            credentials.refresh(Request())
+
+    async def keep_credentials_fresh(self, loop, interval):
+        """Refreshes the credentials periodically, off the event loop."""
+        while True:
+            try:
+                await loop.run_in_executor(executor, self.refresh_credentials)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Could not refresh the Translate credentials: {e}")
 
+            await asyncio.sleep(interval)
+
+    def start(self, loop, interval=300.0):
+        """Starts the background credentials refresh task."""
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = loop.create_task(
+                self.keep_credentials_fresh(loop, interval)
+            )
+
+    def stop(self):
+        """Stops the background credentials refresh task."""
+        if self.refresh_task is not None:
+            self.refresh_task.cancel()
+            self.refresh_task = None
+
+
+translate_client = TranslateClient()
+
+
+async def run_in_executor(func, *args):
+    """Runs a blocking Translate API call in the dedicated executor."""
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(executor, func, *args)
+
+
+def normalize_text(text):
+    """Normalizes text, or a sequence of texts, for cache lookups."""
+    if isinstance(text, six.binary_type):
+        text = text.decode("utf-8")
+    if isinstance(text, six.string_types):
+        return unicodedata.normalize("NFC", text).strip()
+    return [normalize_text(value) for value in text]
+
+
+def hash_text(text):
+    """Returns a short, fixed size digest of the normalized text."""
+    encoded = json.dumps(normalize_text(text), ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def detection_cache_key(text):
+    """Cache key of a language detection."""
+    return f"detect:{hash_text(text)}"
+
+
+def translation_cache_key(target_language, text, model="nmt"):
+    """Cache key of a translation, by text, target language and model."""
+    return f"translate:{hash_text(text)}:{target_language}:{model}"
+
+
+def request_language_detection(text):
+    """Detects the text's language (blocking).
+
+    Text can be a string or a sequence of strings, in which case a sequence
+    of languages is returned.
+    """
+    result = translate_client.get().detect_language(text)
+
+    if isinstance(result, list):
+        return [str(detection["language"]) for detection in result]
+    return str(result["language"])
+
+
+def request_translation(target_language, text, model="nmt"):
+    """Translates text into the target language (blocking)."""
     if isinstance(text, six.binary_type):
         text = text.decode("utf-8")
 
     # Text can be a string or a sequence of strings, in which case this method
     # will return a sequence of results for each text.
-    result = translate_client.translate(
+    result = translate_client.get().translate(
         values=text, target_language=target_language, model=model
     )
 
+    if isinstance(result, list):
+        return [translation["translatedText"] for translation in result]
     return result["translatedText"]
 
 
+async def detect_language_batch(key, texts):
+    """Detects the language of a batch of texts in a single request."""
+    return await translate_guard.call_hedged(
+        run_in_executor, request_language_detection, texts
+    )
+
+
+async def translate_batch(key, texts):
+    """Translates a batch of texts sharing a target and model in a single request."""
+    target_language, model = key
+    return await translate_guard.call_hedged(
+        run_in_executor, request_translation, target_language, texts, model
+    )
+
+
+detection_batcher = MicroBatcher(
+    "detect",
+    detect_language_batch,
+    max_delay=TRANSLATE_BATCH_DELAY,
+    max_batch_size=TRANSLATE_BATCH_SIZE,
+    max_batch_cost=TRANSLATE_BATCH_CHARACTERS,
+)
+
+translation_batcher = MicroBatcher(
+    "translate",
+    translate_batch,
+    max_delay=TRANSLATE_BATCH_DELAY,
+    max_batch_size=TRANSLATE_BATCH_SIZE,
+    max_batch_cost=TRANSLATE_BATCH_CHARACTERS,
+)
+
+
+@cached(
+    translation_cache,
+    TRANSLATION_CACHE_TTL,
+    stale_on_error=True,
+    key_func=detection_cache_key,
+)
+@coalesced(translate_calls)
+async def detect_language(text):
+    """Detects the text's language."""
+    if isinstance(text, six.binary_type):
+        text = text.decode("utf-8")
+    if isinstance(text, six.string_types):
+        return await within_deadline(detection_batcher.submit(None, text))
+
+    return await within_deadline(
+        translate_guard.call(run_in_executor, request_language_detection, text)
+    )
+
+
+async def identify_language(text, min_confidence=LANGUAGE_DETECTION_MIN_CONFIDENCE):
+    """Detects the text's language locally, asking the Translate API when unsure."""
+    language_code, confidence = language_detector.detect(text)
+    if language_code is not None and confidence >= min_confidence:
+        return language_code
+
+    return await detect_language(text)
+
+
+def request_languages(target_language="en"):
+    """Lists the languages available (blocking)."""
+    return translate_client.get().get_languages(target_language=target_language)
+
+
+async def list_languages(target_language="en"):
+    """List alll languages available."""
+    languages = await translate_guard.call(
+        run_in_executor, request_languages, target_language
+    )
+
+    for language in languages:
+        logger.info("{name} ({language})".format(**language))
+
+    return languages
+
+
+@coalesced(translate_calls)
+async def translate_uncached(target_language, text, model="nmt"):
+    """Translates text into the target language, bypassing the translation cache.
+
+    Target must be an ISO 639-1 lanfuage code.
+    """
+    if isinstance(text, six.binary_type):
+        text = text.decode("utf-8")
+    if isinstance(text, six.string_types):
+        return await within_deadline(
+            translation_batcher.submit((target_language, model), text)
+        )
+
+    return await within_deadline(
+        translate_guard.call(
+            run_in_executor, request_translation, target_language, text, model
+        )
+    )
+
+
+@cached(
+    translation_cache,
+    TRANSLATION_CACHE_TTL,
+    stale_on_error=True,
+    key_func=translation_cache_key,
+)
+async def translate_text(target_language, text, model="nmt"):
+    """Translates text into the target language.
+
+    Target must be an ISO 639-1 lanfuage code.
+    """
+    return await translate_uncached(target_language, text, model)
+
+
+async def translate_long_text(
+    target_language,
+    text,
+    model="nmt",
+    *,
+    chunk_characters=TRANSLATE_CHUNK_CHARACTERS,
+    window=TRANSLATE_CHUNK_WINDOW,
+):
+    """Translates a long text chunk by chunk, yielding translated chunks in order.
+
+    Up to `window` chunks are translated concurrently, so the first chunks
+    are yielded while the following ones are still being translated.
+    """
+    chunks = iter(chunk_text(text, chunk_characters))
+    pending = deque()
+
+    def schedule():
+        chunk = next(chunks, None)
+        if chunk is not None:
+            pending.append(
+                asyncio.ensure_future(translate_text(target_language, chunk, model))
+            )
+
+    try:
+        for _ in range(window):
+            schedule()
+
+        while pending:
+            translation = await pending[0]
+            pending.popleft()
+            schedule()
+            yield translation
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 if __name__ == "__main__":
-    print(translate_text("en", "This is a test"))
-    detect_language("Hola, esta es una prueba")
+    print(request_translation("en", "This is a test"))
+    request_language_detection("Hola, esta es una prueba")
@@ -0,0 +1,168 @@
+import os
+import json
+import asyncio
+from os.path import join
+from datetime import datetime, timedelta, timezone
+
+from .cache import CACHE_PATH
+from .dictionary import get_word_of_the_day
+from .logger import generate_logger
+
+WORD_OF_THE_DAY_PATH = join(CACHE_PATH, "word_of_the_day.json")
+
+logger = generate_logger(__name__)
+
+
+def utc_today():
+    """Returns the current UTC date as an ISO formatted string."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def seconds_until_midnight():
+    """Returns the number of seconds until the next midnight (UTC)."""
+    now = datetime.now(timezone.utc)
+    midnight = (now + timedelta(days=1)).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+    return (midnight - now).total_seconds()
+
+
+class WordOfTheDay:
+    """Keeps the word of the day in memory.
+
+    The word is fetched once a day at midnight UTC by a background task and
+    persisted to disk, so it survives restarts. Failed fetches are retried
+    with exponential backoff.
+
+    Parameters
+    ------------
+    path: str
+        The file where the word of the day is persisted.
+    on_update: Callable[[WordOfTheDay], None]
+        Called every time a new word of the day is available.
+    """
+
+    def __init__(
+        self,
+        path=WORD_OF_THE_DAY_PATH,
+        *,
+        on_update=None,
+        initial_retry_delay=5.0,
+        max_retry_delay=600.0,
+    ):
+        """Initialisation for WordOfTheDay instance."""
+        self.path = path
+        self.on_update = on_update
+        self.initial_retry_delay = initial_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.task = None
+
+        self.date = None
+        self.word = None
+        self.definitions = []
+
+        self.load()
+
+    @property
+    def is_available(self):
+        """Whether there is a word of the day to show."""
+        return self.word is not None and len(self.definitions) > 0
+
+    @property
+    def is_current(self):
+        """Whether the word of the day in memory is today's one."""
+        return self.is_available and self.date == utc_today()
+
+    def load(self):
+        """Loads the persisted word of the day."""
+        try:
+            with open(self.path) as json_file:
+                data = json.load(json_file)
+                self.date = data["date"]
+                self.word = data["word"]
+                self.definitions = data["definitions"]
+
+        except FileNotFoundError:
+            pass
+        except (IOError, ValueError, KeyError) as e:
+            logger.error(f"Could not load the word of the day: {e}")
+
+    def save(self):
+        """Persists the word of the day."""
+        data = {"date": self.date, "word": self.word, "definitions": self.definitions}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = self.path + ".tmp"
+
+        with open(temporary_path, "w") as json_file:
+            json.dump(data, json_file)
+
+        # Replace the file atomically, so a crash never leaves it half written
+        os.replace(temporary_path, self.path)
+
+    async def refresh(self):
+        """Fetches today's word of the day."""
+        date = utc_today()
+        word, definitions = await get_word_of_the_day(date)
+
+        self.date = date
+        self.word = word
+        self.definitions = list(definitions)
+
+        try:
+            self.save()
+        except IOError as e:
+            logger.error(f"Could not save the word of the day: {e}")
+
+        logger.info(f"Word of the day for {date}: {word}")
+        self.notify()
+
+    def notify(self):
+        """Calls `on_update`, whose errors are not taken for failed fetches."""
+        if self.on_update is None:
+            return
+
+        try:
+            self.on_update(self)
+        except Exception as e:
+            logger.error(f"Could not handle the new word of the day: {e}")
+
+    async def refresh_with_backoff(self):
+        """Fetches today's word of the day, retrying until it succeeds."""
+        delay = self.initial_retry_delay
+
+        while True:
+            try:
+                await self.refresh()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(
+                    f"Could not fetch the word of the day, retrying in {delay:.0f}s: {e}"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    async def run(self):
+        """Refreshes the word of the day every midnight (UTC)."""
+        if self.is_current:
+            self.notify()
+        else:
+            await self.refresh_with_backoff()
+
+        while True:
+            # Wait a bit after midnight, so the new word is already published
+            await asyncio.sleep(seconds_until_midnight() + 5.0)
+            await self.refresh_with_backoff()
+
+    def start(self, loop):
+        """Starts the background refresh task."""
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self.run())
+
+    def stop(self):
+        """Stops the background refresh task."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
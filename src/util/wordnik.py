@@ -0,0 +1,200 @@
+import os
+import asyncio
+from urllib.parse import quote
+
+import aiohttp
+
+from .deadlines import DeadlineExceeded, Hedger, remaining_time, within_deadline
+from .resilience import UpstreamGuard
+
+WORDNIK_API_KEY = os.getenv("WORDNIK_API_KEY")
+WORDNIK_API_URL = os.getenv("WORDNIK_API_URL") or "https://api.wordnik.com/v4"
+
+# Connection pool and timeout settings
+WORDNIK_MAX_CONNECTIONS = int(os.getenv("WORDNIK_MAX_CONNECTIONS", "100"))
+WORDNIK_KEEPALIVE_TIMEOUT = float(os.getenv("WORDNIK_KEEPALIVE_TIMEOUT", "30"))
+WORDNIK_REQUEST_TIMEOUT = float(os.getenv("WORDNIK_REQUEST_TIMEOUT", "10"))
+
+# Quota (requests per hour) and circuit breaker settings
+WORDNIK_RATE_LIMIT = float(os.getenv("WORDNIK_RATE_LIMIT", "15000"))
+WORDNIK_RATE_BURST = int(os.getenv("WORDNIK_RATE_BURST", "50"))
+WORDNIK_FAILURE_THRESHOLD = int(os.getenv("WORDNIK_FAILURE_THRESHOLD", "5"))
+WORDNIK_RESET_TIMEOUT = float(os.getenv("WORDNIK_RESET_TIMEOUT", "30"))
+
+# Requests slower than this latency percentile are sent a second time
+WORDNIK_HEDGE = (os.getenv("WORDNIK_HEDGE") or "true").lower() == "true"
+WORDNIK_HEDGE_PERCENTILE = float(os.getenv("WORDNIK_HEDGE_PERCENTILE", "0.95"))
+
+
+class WordnikError(Exception):
+    """Raised when the Wordnik API answers with an error status."""
+
+    def __init__(self, status, message):
+        super().__init__(f"Wordnik API error {status}: {message}")
+        self.status = status
+
+
+def is_wordnik_failure(error):
+    """Whether an error means Wordnik is unhealthy, rather than a bad request."""
+    if isinstance(error, WordnikError):
+        return error.status == 429 or error.status >= 500
+    return True
+
+
+class WordnikClient:
+    """Asynchronous Wordnik API client.
+
+    A single keep-alive connection pool is shared by every request, so
+    hundreds of lookups can be in flight without blocking the event loop.
+    The underlying session is created lazily on the first request, which
+    lets the client be instantiated at import time.
+    """
+
+    def __init__(
+        self,
+        api_key=WORDNIK_API_KEY,
+        api_url=WORDNIK_API_URL,
+        *,
+        max_connections=WORDNIK_MAX_CONNECTIONS,
+        keepalive_timeout=WORDNIK_KEEPALIVE_TIMEOUT,
+        timeout=WORDNIK_REQUEST_TIMEOUT,
+        guard=None,
+    ):
+        """Initialisation for WordnikClient instance."""
+        self.api_key = api_key
+        self.api_url = api_url.rstrip("/")
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.guard = guard
+        self._session = None
+
+    @property
+    def session(self):
+        """Returns the shared HTTP session, creating it if needed."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                raise_for_status=False,
+            )
+        return self._session
+
+    async def close(self):
+        """Closes the shared HTTP session and its connection pool."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def build_params(self, params):
+        """Converts keyword arguments to Wordnik query parameters."""
+        query = {}
+
+        if self.api_key is not None:
+            query["api_key"] = self.api_key
+
+        for key, value in params.items():
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = str(value).lower()
+            elif isinstance(value, (list, tuple)):
+                value = ",".join(str(item) for item in value)
+            query[key] = value
+
+        return query
+
+    def word_path(self, word, resource):
+        """Returns the API path of a word resource."""
+        return f"word.json/{quote(word, safe='')}/{resource}"
+
+    async def get(self, path, *, timeout=None, **params):
+        """Performs a GET request against the API and returns the decoded JSON.
+
+        Requests go through the client guard, if any, so they fail fast once
+        the quota is exhausted or Wordnik keeps failing, and are hedged when
+        slow. They time out when the deadline of the command runs out.
+        """
+        if self.guard is not None:
+            return await within_deadline(
+                self.guard.call_hedged(self.request, path, timeout, params)
+            )
+        return await within_deadline(self.request(path, timeout, params))
+
+    async def request(self, path, timeout, params):
+        """Performs a GET request against the API."""
+        url = f"{self.api_url}/{path.lstrip('/')}"
+        timeout = timeout or self.timeout
+
+        # Both the request and its hedge give up with the command
+        remaining = remaining_time()
+        bound_by_deadline = remaining is not None and remaining < timeout
+        if bound_by_deadline:
+            if remaining <= 0:
+                raise DeadlineExceeded()
+            timeout = remaining
+
+        try:
+            async with self.session.get(
+                url,
+                params=self.build_params(params),
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                if response.status >= 400:
+                    raise WordnikError(response.status, await response.text())
+                return await response.json(content_type=None)
+        except (asyncio.TimeoutError, aiohttp.ClientError):
+            # Timeouts may surface as connection errors, depending on the version
+            if bound_by_deadline and remaining_time() <= 0:
+                raise DeadlineExceeded() from None
+            raise
+
+    async def get_examples(self, word, **params):
+        """Returns the examples of a word."""
+        return await self.get(self.word_path(word, "examples"), **params)
+
+    async def get_definitions(self, word, **params):
+        """Returns the definitions of a word."""
+        return await self.get(self.word_path(word, "definitions"), **params)
+
+    async def get_related_words(self, word, **params):
+        """Returns the related words of a word grouped by relationship type."""
+        return await self.get(self.word_path(word, "relatedWords"), **params)
+
+    async def get_word_of_the_day(self, **params):
+        """Returns the word of the day."""
+        return await self.get("words.json/wordOfTheDay", **params)
+
+    async def get_random_word(self, **params):
+        """Returns a random word."""
+        return await self.get("words.json/randomWord", **params)
+
+    async def get_random_words(self, **params):
+        """Returns a list of random words."""
+        return await self.get("words.json/randomWords", **params)
+
+
+# Process-wide client shared by every dictionary helper
+client = WordnikClient(
+    guard=UpstreamGuard(
+        "wordnik",
+        rate_limit=WORDNIK_RATE_LIMIT,
+        burst=WORDNIK_RATE_BURST,
+        failure_threshold=WORDNIK_FAILURE_THRESHOLD,
+        reset_timeout=WORDNIK_RESET_TIMEOUT,
+        is_failure=is_wordnik_failure,
+        hedger=Hedger(
+            "wordnik", percentile=WORDNIK_HEDGE_PERCENTILE, enabled=WORDNIK_HEDGE
+        ),
+    )
+)
+
+
+async def close_wordnik_client():
+    """Closes the process-wide Wordnik client."""
+    await client.close()